@@ -4,7 +4,7 @@
 import matplotlib.pyplot as plt
 import numpy as np
 from aocd.models import Puzzle
-from funcy import print_calls
+from funcy import print_calls, chunks
 
 from gridtools import dict_to_array
 from intcode import IntcodeMachine
@@ -17,10 +17,9 @@ def painting_robot(program, start=BLACK):
     pos, face = 0, 1j
     panels = {pos: start}
 
-    while not robot.done:
-        sensor = panels.get(pos, BLACK)
-        robot.execute(inputs=[sensor])
-        paint, turn = robot.get_output(n=2)
+    # the robot reads the sensor whenever it needs input and streams pairs of output values
+    robot.on_input = lambda: panels.get(pos, BLACK)
+    for paint, turn in chunks(2, robot.stream()):
 
         # paint current cell
         panels[pos] = paint
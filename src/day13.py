@@ -23,9 +23,11 @@ def plot_tiles(tiles, view):
     plt.pause(.02)
 
 
-def read_tiles(robot, tiles=None) -> Tuple[Dict[Tuple[int, int], int], int]:
-    tiles, score = {} if not tiles else tiles, 0
-    for x, y, tile in chunks(3, robot.get_output(None, pop=True)):
+def read_tiles(robot, tiles=None, stream=False) -> Tuple[Dict[Tuple[int, int], int], int]:
+    # streaming updates the tiles in place while the game is running, e.g. for the input callback
+    tiles, score = {} if tiles is None else tiles, 0
+    values = robot.stream() if stream else robot.get_output(None, pop=True)
+    for x, y, tile in chunks(3, values):
         if x == -1 and y == 0:
             score = tile  # special score tile
         else:
@@ -57,23 +59,17 @@ def part2(program, visualize=False):
     robot = IntcodeMachine(program)
     robot.memory[0] = 2  # free game mode
 
-    # render board
-    robot.execute()
-    tiles, score = read_tiles(robot)
+    tiles = {}
+    view = init_interactive_plot() if visualize else None
 
-    if visualize:
-        view = init_interactive_plot()
-        plot_tiles(tiles, view)
-
-    while not robot.done:
-        direction = compute_move(tiles)
-
-        # apply move and re-render board
-        robot.execute(inputs=[direction])
-        tiles, score = read_tiles(robot, tiles)
-
-        if visualize:
+    def next_move():
+        # the board is complete whenever the game asks for the next move
+        if view is not None:
             plot_tiles(tiles, view)
+        return compute_move(tiles)
+
+    robot.on_input = next_move
+    _, score = read_tiles(robot, tiles, stream=True)
 
     return score
 
@@ -19,7 +19,7 @@ FACE_MAPPING = {UP: 1j, RIGHT: 1 + 0j, DOWN: -1j, LEFT: -1 + 0j}
 def get_complex_grid(robot, flip):
     # ask the robot for the current field structure and return a complex grid
     robot.execute()
-    field = "".join(map(chr, robot.get_output(None, pop=True)[:-2]))  # :-2 to remove double line breaks at end
+    field = robot.read_text()[:-2]  # :-2 to remove double line breaks at end
     field = array_to_dict(text_to_array(field, flip=flip), ignore_values=[FREE])
     return ComplexGrid(field)
 
@@ -187,13 +187,12 @@ def get_commands(functions, main_routine):
         commands.append(",".join(map(str, flatten(functions[i]))))
 
     # n for disabling interactive mode
-    result = list(map(ord, "\n".join(commands) + "\n" + "n\n"))
-    return result
+    return "\n".join(commands) + "\n" + "n\n"
 
 
 @print_calls
 def part1(program):
-    robot = IntcodeMachine(program)
+    robot = IntcodeMachine(program, ascii=True)
     cg = get_complex_grid(robot, flip=False)
     intersections = get_intersections(cg)
 
@@ -203,7 +202,7 @@ def part1(program):
 
 @print_calls
 def part2(program):
-    robot = IntcodeMachine(program)
+    robot = IntcodeMachine(program, ascii=True)
     cg = get_complex_grid(robot, flip=True)
 
     # find a path on the scaffolds
@@ -214,7 +213,7 @@ def part2(program):
     solution = get_commands(functions, main_routine)
 
     # switch to interactive mode and submit commands
-    robot = IntcodeMachine(program)
+    robot = IntcodeMachine(program, ascii=True)
     robot.memory[0] = 2
     collected_dust = robot.execute(inputs=solution)
 
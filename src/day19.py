@@ -12,11 +12,15 @@ from funcy import print_calls, first
 
 from gridtools import dict_to_array, complex_to_tuple, tuple_to_complex
 from intcode import IntcodeMachine
+from intcodecache import RunCache
 from util import init_interactive_plot
 from lazysequence import LazySequence
 
 FREE, BEAM = 0, 1
 
+# probes of the same coordinates give the same results, across all parts and beams
+RUNS = RunCache()
+
 
 class TractorBeam(object):
 
@@ -29,7 +33,7 @@ class TractorBeam(object):
         # move the drone to the target position and save and return the observed cell state
         if pos not in self.grid:
             self.drone.reset()
-            status = self.drone.execute(inputs=complex_to_tuple(pos), pop=True)
+            status = self.drone.execute(inputs=complex_to_tuple(pos), nopause=True, pop=True)
             self.grid[pos] = status
 
         return self.grid[pos]
@@ -111,7 +115,7 @@ def fast_bounds(arr, low: int = None, upr: int = None):
 
 @print_calls
 def part1(program, size=50):
-    beam = TractorBeam(IntcodeMachine(program))
+    beam = TractorBeam(IntcodeMachine(program, warm=0, cache=RUNS))
     beam.map(size)
 
     return sum(e for e in beam.grid.values() if e == BEAM)
@@ -119,7 +123,7 @@ def part1(program, size=50):
 
 @print_calls
 def part2(program, box=100):
-    beam = TractorBeam(IntcodeMachine(program))
+    beam = TractorBeam(IntcodeMachine(program, warm=0, cache=RUNS))
 
     beam.map(int(1E5), until_fit=box)
     match = beam.fit_box(int(1E5), box)
@@ -1,15 +1,15 @@
 # Advent of Code 2019, Day 2
 # (c) blu3r4y
 
-from itertools import product
-
 import numpy as np
 
 from aocd.models import Puzzle
 from funcy import print_calls
 
+from intcodesym import solve
+
 
-def intcode(ops, noun=12, verb=2, stop=None):
+def intcode(ops, noun=12, verb=2):
     ops[1], ops[2] = noun, verb
 
     for i in range(0, len(ops), 4):
@@ -23,10 +23,6 @@ def intcode(ops, noun=12, verb=2, stop=None):
         elif code == 2:  # multiplication
             ops[dest] = ops[a] * ops[b]
 
-        # early stopping if output equals stopcode
-        if stop is not None and ops[0] == stop:
-            return ops[0]
-
     return ops[0]
 
 
@@ -37,9 +33,11 @@ def part1(ops):
 
 @print_calls
 def part2(ops, stop=19690720):
-    for noun, verb in product(range(0, 100), repeat=2):
-        if intcode(ops.copy(), noun, verb, stop) == stop:
-            return 100 * noun + verb
+    # ops[0] is a closed-form polynomial of noun and verb, which is solved for the verb
+    domains = {"noun": range(0, 100), "verb": range(0, 100)}
+    solution = solve(ops, stop, domains, variables={1: "noun", 2: "verb"}, cell=0)
+    if solution is not None:
+        return 100 * solution["noun"] + solution["verb"]
 
 
 def load(data):
@@ -7,30 +7,31 @@ from aocd.models import Puzzle
 from funcy import print_calls
 
 from intcode import IntcodeMachine
+from intcodecache import RunCache
+from intcodenet import ring
+
+# amplifier runs with the same phase setting and signal give the same result, across all permutations
+RUNS = RunCache()
 
 
 def execute_series(ops, seq):
-    a = IntcodeMachine(ops, [seq[0], 0]).execute(nopause=True)
-    b = IntcodeMachine(ops, [seq[1], a]).execute(nopause=True)
-    c = IntcodeMachine(ops, [seq[2], b]).execute(nopause=True)
-    d = IntcodeMachine(ops, [seq[3], c]).execute(nopause=True)
-    e = IntcodeMachine(ops, [seq[4], d]).execute(nopause=True)
+    a = IntcodeMachine(ops, [seq[0], 0], warm=1, cache=RUNS).execute(nopause=True)
+    b = IntcodeMachine(ops, [seq[1], a], warm=1, cache=RUNS).execute(nopause=True)
+    c = IntcodeMachine(ops, [seq[2], b], warm=1, cache=RUNS).execute(nopause=True)
+    d = IntcodeMachine(ops, [seq[3], c], warm=1, cache=RUNS).execute(nopause=True)
+    e = IntcodeMachine(ops, [seq[4], d], warm=1, cache=RUNS).execute(nopause=True)
     return e
 
 
 def execute_loop(ops, seq):
-    # create vms and initialize them with their sequence number
-    vms = [IntcodeMachine(ops) for _ in seq]
-    for vm, sid in zip(vms, seq):
-        assert vm.execute([sid]) is None
+    # wire the vms into a feedback loop, initialized with their sequence number, and send the first signal,
+    # the vms start from cached states that already consumed their sequence number
+    network = ring(ops, seq, warm=1)
+    network.feed(0, [0])
 
     # run until all vms are done
-    output = 0
-    while not all([vm.done for vm in vms]):
-        for vm in vms:
-            output = vm.execute([output])  # set input to previous output
-
-    return vms[-1].get_output()
+    network.run()
+    return network.nodes[len(seq) - 1].outputs[-1]
 
 
 @print_calls
@@ -9,12 +9,12 @@ from intcode import IntcodeMachine
 
 @print_calls
 def part1(data):
-    return IntcodeMachine(data).execute([1], nopause=True)
+    return IntcodeMachine(data, engine="compiler").execute([1], nopause=True)
 
 
 @print_calls
 def part2(data):
-    return IntcodeMachine(data).execute([2], nopause=True)
+    return IntcodeMachine(data, engine="compiler").execute([2], nopause=True)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,20 @@
 # Advent of Code 2019, Intcode Machine
 # (c) blu3r4y
 
+import hashlib
+import json
+import os
+import struct
+import sys
 from abc import ABC, abstractmethod
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from copy import copy
 from enum import IntEnum
-from functools import partialmethod
-from typing import List, Union, Sequence
+from functools import lru_cache
+from itertools import islice
+from time import monotonic, perf_counter
+from typing import List, Union, Sequence, Tuple, Callable, Optional, Iterator
 
 import numpy as np
 
@@ -15,6 +25,18 @@ class Mode(IntEnum):
     RELATIVE = 2
 
 
+class Status(IntEnum):
+    HALTED = 0  # the program halted
+    WAITING = 1  # the input buffer is empty
+    OUTPUTS = 2  # the requested number of output values was written
+    BUDGET = 3  # the instruction budget is used up
+    DEADLINE = 4  # the deadline passed
+
+
+# kinds of events in recorded sessions, an input or output value, or the number of instructions of a run
+EVENT_INPUT, EVENT_OUTPUT, EVENT_STEPS = "i", "o", "s"
+
+
 class Opcode(IntEnum):
     ADD = 1
     MUL = 2
@@ -28,258 +50,833 @@ class Opcode(IntEnum):
     HALT = 99
 
 
-class Instruction(ABC):
+# number of input and output parameters per instruction
+SIGNATURES = {
+    Opcode.ADD: (2, 1),
+    Opcode.MUL: (2, 1),
+    Opcode.INPUT: (0, 1),
+    Opcode.OUTPUT: (1, 0),
+    Opcode.JMP_TRUE: (2, 0),
+    Opcode.JMP_FALSE: (2, 0),
+    Opcode.LESS_THAN: (2, 1),
+    Opcode.EQUALS: (2, 1),
+    Opcode.BASE_OFFSET: (1, 0),
+    Opcode.HALT: (0, 0)
+}
+
+# instruction lengths, including the opcode itself
+LENGTHS = {op: 1 + nin + nout for op, (nin, nout) in SIGNATURES.items()}
+
+# plain integer aliases of the parameter modes, which are cheaper to compare on the hot path
+_POSITION, _IMMEDIATE, _RELATIVE = int(Mode.POSITION), int(Mode.IMMEDIATE), int(Mode.RELATIVE)
+_MODES = {_POSITION, _IMMEDIATE, _RELATIVE}
+
+# a decoded instruction is a flat tuple of the form (handler, length, mode_a, a, mode_b, b, mode_c, c),
+# superinstructions start with (handler, length) as well but carry further handler-specific operands
+Decoded = Tuple[Callable, int, int, int, int, int, int, int]
+
+# memory is organized in pages of 2 ** PAGE_BITS cells
+PAGE_BITS = 8
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+# pages beyond this index are kept in a sparse dictionary instead of the dense page table
+DENSE_PAGES = 1 << 12
+
+# images of at least this many cells are kept in numpy memory by the automatic backend selection
+AUTO_NUMPY_CELLS = 1 << 20
+
+# the content of a paged memory at some point, which only consists of read-only pages
+MemoryState = namedtuple("MemoryState", ["pages", "sparse"])
+
+# the full state of a machine at some point, except for its callbacks and cached code,
+# the text buffer is only captured in ascii mode, along with the number of instructions that it took to get there
+MachineState = namedtuple("MachineState", ["ip", "base", "done", "inputs", "outputs", "memory", "text", "steps"],
+                          defaults=[None, 0])
+
 
-    def __init__(self, opcode: int, params: List[int], vm: "IntcodeMachine"):
+class PagedMemory(ABC):
+    """
+    Unbounded memory that keeps the program image dense and pages in the remaining address space on demand
+    """
+
+    def __init__(self, image: np.ndarray):
         """
-        Abstract base constructor for an instruction of the IntCode Machine
-        @param opcode: The opcode along with its parameter mode specification
-        @param params: The parameters for this opcode
-        @param vm: Reference to the intcode machine
+        Create a new memory that is initialized with a program image
+        @param image: Program and data memory, which will not be modified
         """
-        self.opcode, self.params = opcode, params
-        self.instr = Opcode(self.opcode % 100)
-        self.vm = vm
 
-        # decode parameter modes
-        self.modes = [0] * self.nparams()
-        for i in range(0, self.nparams()):
-            self.modes[i] = self.opcode // (10 ** (i + 2)) % 10
+        # split the image into pages that are shared until written, only the last page needs to be padded
+        image = _image_cells(image)
+        full = len(image) - len(image) % PAGE_SIZE
+        cells = [image[i:i + PAGE_SIZE] for i in range(0, full, PAGE_SIZE)]
+        if full < len(image) or full == 0:
+            cells.append(np.concatenate((image[full:], np.zeros(PAGE_SIZE - len(image) + full, dtype=image.dtype))))
 
-    def _get_params(self, nin: int, nout: int) -> Union[int, List[int]]:
-        params = []
+        self.image_pages = [self._share(page) for page in cells]
+        self.zero_page = self._share(np.zeros(PAGE_SIZE, dtype=np.int64))
 
-        for i in range(nin):
-            # input parameters are either positional or immediate
-            if self.modes[i] == Mode.IMMEDIATE:
-                params.append(int(self.params[i]))
-            elif self.modes[i] == Mode.POSITION:
-                params.append(int(self.vm.memory[self.params[i]]))
-            elif self.modes[i] == Mode.RELATIVE:
-                params.append(int(self.vm.memory[self.vm.base + self.params[i]]))
+        self.pages = list(self.image_pages)  # dense page table, shared pages are copied on their first write
+        self.sparse = {}  # pages that are too far away for the dense page table
+        self.dirty = set()  # indices of all pages that might differ from the program image
+        self.on_write = None  # optional callback which is notified about external writes
 
-        for i in range(nin, nin + nout):
-            # output parameters are always memory addresses because they will be written
-            if self.modes[i] == Mode.IMMEDIATE:
-                raise ValueError(f"unsupported immediate mode for instruction {self.opcode} at ip = {self.vm.ip}")
-            if self.modes[i] == Mode.POSITION:
-                params.append(self.params[i])
-            elif self.modes[i] == Mode.RELATIVE:
-                params.append(self.vm.base + self.params[i])
-
-        assert len(params) == nin + nout
-        return params if len(params) > 1 else params[0]  # return scalar or list
+    @property
+    @abstractmethod
+    def native(self) -> bool:
+        """
+        @return: True if cells hold Python integers, False if they need to be converted when read
+        """
+        pass
 
-    @classmethod
-    def nparams(cls) -> int:
+    @abstractmethod
+    def _share(self, cells: np.ndarray) -> Sequence[int]:
         """
-        @return: Number of parameters
+        @param cells: The content of one page
+        @return: A read-only page, which raises an exception on writes
         """
-        return cls.length() - 1
+        pass
 
-    @classmethod
     @abstractmethod
-    def length(cls) -> int:
+    def _private(self, page: Sequence[int]) -> Sequence[int]:
         """
-        @return: Instruction length
+        @param page: Some page
+        @return: A writable copy of the page if it is read-only, otherwise None
         """
         pass
 
     @abstractmethod
-    def apply(self) -> int:
+    def _freeze(self, page: Sequence[int]) -> Sequence[int]:
         """
-        Perform the instruction
-        @return: Optional new instruction pointer if not None
+        @param page: Some page, which will not be written anymore
+        @return: A read-only version of the page, which may be the page itself
         """
         pass
 
+    def reset(self) -> List[int]:
+        """
+        Revert all cells to the program image and release all further pages, which only touches dirty pages
+        @return: The indices of all pages that were changed by the reset
+        """
+        changed = list(self.dirty)
+
+        nimage = len(self.image_pages)
+        for i in changed:
+            if i < nimage:
+                self.pages[i] = self.image_pages[i]
+
+        del self.pages[nimage:]
+        self.sparse.clear()
+        self.dirty.clear()
+        return changed
+
+    def snapshot(self) -> MemoryState:
+        """
+        Capture the content of all cells by turning every written page into a shared page,
+        so that both this memory and the snapshot copy a page again before it is written
+        @return: The current content of the memory
+        """
+        for i, page in enumerate(self.pages):
+            self.pages[i] = self._freeze(page)
+        for i, page in self.sparse.items():
+            self.sparse[i] = self._freeze(page)
+
+        return MemoryState(tuple(self.pages), dict(self.sparse))
+
+    def restore(self, state: MemoryState) -> List[int]:
+        """
+        Revert all cells to a snapshot, which can be restored again later on
+        @param state: A snapshot of this memory or of a memory with the same backend
+        @return: The indices of all pages that were changed by the restore
+        """
+        pages, sparse = state
+
+        # pages that are still shared with the snapshot did not change
+        changed = [i for i in range(max(len(pages), len(self.pages)))
+                   if i >= len(pages) or i >= len(self.pages) or pages[i] is not self.pages[i]]
+        changed += [i for i in set(sparse) | set(self.sparse) if sparse.get(i) is not self.sparse.get(i)]
+
+        # the page table is updated in place, because the machine references it
+        self.pages[:] = pages
+        self.sparse.clear()
+        self.sparse.update(sparse)
+
+        nimage = len(self.image_pages)
+        self.dirty.clear()
+        self.dirty.update(i for i, page in enumerate(pages)
+                          if page is not (self.image_pages[i] if i < nimage else self.zero_page))
+        self.dirty.update(sparse)
+        return changed
+
+    def fork(self) -> "PagedMemory":
+        """
+        Create an independent copy of this memory, which initially shares all pages with this one
+        @return: The copy, without an on_write callback
+        """
+        clone = copy(self)
+        clone.pages, clone.sparse, clone.dirty, clone.on_write = [], {}, set(), None
+        clone.restore(self.snapshot())
+        return clone
+
+    def adopt(self, other: "PagedMemory") -> List[int]:
+        """
+        Take over the content of another memory of the same program image, which may use a different backend,
+        pages that were never written stay shared with the program image
+        @param other: The other memory
+        @return: The indices of all pages that were changed
+        """
+        nimage = len(self.image_pages)
+
+        def convert(i: int, page: Sequence[int]) -> Sequence[int]:
+            if page is (other.image_pages[i] if i < nimage else other.zero_page):
+                return self.image_pages[i] if i < nimage else self.zero_page
+            return self._share(np.asarray(page))
+
+        return self.restore(MemoryState(tuple(convert(i, page) for i, page in enumerate(other.pages)),
+                                        {i: convert(i, page) for i, page in other.sparse.items()}))
+
+    def diff(self) -> dict:
+        """
+        @return: The values of all cells that differ from the program image by their address
+        """
+        nimage = len(self.image_pages)
+        changes = {}
+        for i in sorted(self.dirty):
+            page = self.pages[i] if i < DENSE_PAGES else self.sparse[i]
+            original = self.image_pages[i] if i < nimage else self.zero_page
+            changes.update(((i << PAGE_BITS) + j, int(value))
+                           for j, (value, before) in enumerate(zip(page, original)) if value != before)
+
+        return changes
+
+    def read(self, addr: int) -> int:
+        """
+        Read a single cell, cells that were never written are zero
+        @param addr: The memory address
+        @return: The value at that address
+        """
+        if addr < 0:
+            raise IndexError(f"negative memory address {addr}")
+
+        page = addr >> PAGE_BITS
+        if page < len(self.pages):
+            return int(self.pages[page][addr & PAGE_MASK])
+        if page in self.sparse:
+            return int(self.sparse[page][addr & PAGE_MASK])
 
-class HaltInstr(Instruction):
+        return 0
 
-    @classmethod
-    def length(cls) -> int:
-        return 1
+    def write(self, addr: int, value: int):
+        """
+        Write a single cell and allocate a private page for it if necessary
+        @param addr: The memory address
+        @param value: The new value
+        """
+        if addr < 0:
+            raise IndexError(f"negative memory address {addr}")
+
+        page = addr >> PAGE_BITS
+        if page < DENSE_PAGES:
+            # grow the page table with shared zero pages
+            if page >= len(self.pages):
+                self.pages.extend([self.zero_page] * (page - len(self.pages) + 1))
+            frame = self.pages[page]
+        else:
+            frame = self.sparse.get(page, self.zero_page)
+
+        # copy shared pages before the first write
+        private = self._private(frame)
+        if private is not None:
+            frame = private
+            self.dirty.add(page)
+            if page < DENSE_PAGES:
+                self.pages[page] = frame
+            else:
+                self.sparse[page] = frame
+
+        frame[addr & PAGE_MASK] = value
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[int, Sequence[int]]:
+        if isinstance(key, slice):
+            return [self.read(addr) for addr in range(*key.indices(len(self)))]
+        return self.read(key)
+
+    def __setitem__(self, addr: int, value: int):
+        self.write(addr, value)
+        if self.on_write is not None:
+            self.on_write(addr)
+
+    def __len__(self) -> int:
+        """
+        @return: The size of the densely addressed memory region
+        """
+        return len(self.pages) * PAGE_SIZE
+
+
+class NumpyMemory(PagedMemory):
+    """
+    Paged memory with np.int64 pages, shared pages are read-only copies,
+    writing a value beyond the int64 range raises an OverflowError instead of wrapping around
+    """
+
+    native = False
+
+    def __init__(self, image: np.ndarray):
+        if _image_cells(image).dtype == object:
+            raise ValueError("the program holds values beyond the int64 range, which needs the list backend")
+        super().__init__(image)
+
+    def _share(self, cells: np.ndarray) -> np.ndarray:
+        # read-only cells, e.g. of a shared or memory-mapped image, can be used as they are
+        cells = np.asarray(cells)
+        if cells.flags.writeable:
+            cells = cells.copy()
+            cells.flags.writeable = False
+        return cells
+
+    def _private(self, page: np.ndarray) -> np.ndarray:
+        return page.copy() if not page.flags.writeable else None
 
-    def apply(self) -> int:
-        pass  # nop
+    def _freeze(self, page: np.ndarray) -> np.ndarray:
+        page.flags.writeable = False  # private pages are copies, so nobody else writes them
+        return page
 
+    def __getitem__(self, key: Union[int, slice]) -> Union[int, np.ndarray]:
+        if isinstance(key, slice):
+            return np.array(super().__getitem__(key), dtype=np.int64)
+        return self.read(key)
 
-class HaltInstrInternal(HaltInstr):
+
+class ListMemory(PagedMemory):
     """
-    Internal forced halt that is used to pause the execution
+    Paged memory with pages of Python integers, which are cheaper to access one at a time and never overflow,
+    shared pages are tuples and private pages are lists
     """
-    pass
 
+    native = True
 
-class AddInstr(Instruction):
+    def _share(self, cells: np.ndarray) -> tuple:
+        return tuple(cells.tolist())
 
-    @classmethod
-    def length(cls) -> int:
-        return 4
+    def _private(self, page: Sequence[int]) -> list:
+        return list(page) if isinstance(page, tuple) else None
 
-    def apply(self):
-        a, b, c = self._get_params(2, 1)
-        self.vm.memory[c] = a + b
+    def _freeze(self, page: Sequence[int]) -> tuple:
+        return tuple(page) if isinstance(page, list) else page
 
 
-class MulInstr(Instruction):
+# available memory backends
+BACKENDS = {
+    "list": ListMemory,
+    "numpy": NumpyMemory
+}
 
-    @classmethod
-    def length(cls) -> int:
-        return 4
 
-    def apply(self):
-        a, b, c = self._get_params(2, 1)
-        self.vm.memory[c] = a * b
+def select_backend(image: np.ndarray, backend: str = "auto") -> str:
+    """
+    @param image: Program and data memory
+    @param backend: One of the BACKENDS, or "auto" to use list memory unless the image is very large
+                    and all of its values fit into int64 cells
+    @return: The name of the backend
+    """
+    if backend == "auto":
+        image = _image_cells(image)
+        return "numpy" if len(image) >= AUTO_NUMPY_CELLS and image.dtype != object else "list"
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown memory backend {backend}")
 
+    return backend
 
-class InputInstr(Instruction):
 
-    def __init__(self, opcode: int, params: List[int], vm: "IntcodeMachine", value: int):
-        super().__init__(opcode, params, vm)
-        self.value = value
+def create_memory(image: np.ndarray, backend: str = "auto") -> PagedMemory:
+    """
+    Create the memory for a program image
+    @param image: Program and data memory
+    @param backend: One of the BACKENDS, or "auto", see select_backend()
+    @return: A new memory instance
+    """
+    return BACKENDS[select_backend(image, backend)](image)
 
-    @classmethod
-    def length(cls) -> int:
-        return 2
 
-    def apply(self):
-        a = self._get_params(0, 1)
-        self.vm.memory[a] = self.value
+def _image_cells(image: Sequence[int]) -> np.ndarray:
+    # int64 cells, unless some value is out of range, then the cells hold Python integers
+    image = np.asarray(image)
+    return image if image.dtype == object else np.asarray(image, dtype=np.int64)
 
-    @staticmethod
-    def build_input_instruction(value: int):
+
+# binary image files start with this signature, followed by the length of a json header
+IMAGE_MAGIC = b"INTCODE\x01"
+
+# version of the image file layout, which is stored in the json header
+IMAGE_VERSION = 2
+
+
+class ProgramImage(object):
+
+    def __init__(self, memory: Union[np.ndarray, str], digest: str = None, metadata: dict = None):
         """
-        Factory method that returns an input instruction that will always input the provided value
-        @param value: The value to be inputted if this instruction is applied
-        @return: An instantiable `InputInstr`
+        A parsed, read-only program image, which can be shared by any number of machines, also across processes.
+        Machines share the pages of the image, along with decoded instructions and compiled block sources
+        for all code that was not modified, so that creating another machine of the same program is nearly free.
+        @param memory: Program and data memory
+        @param digest: Hash of the program, if it is already known
+        @param metadata: Arbitrary json-serializable information about the program, which is stored in image files
         """
+        cells = _image_cells(memory if isinstance(memory, np.ndarray) else IntcodeMachine.parse_memory(memory))
+        if cells.flags.writeable:
+            cells = cells.copy()
+            cells.flags.writeable = False
+
+        if digest is None:
+            data = cells.tobytes() if cells.dtype != object else ",".join(map(str, cells.tolist())).encode()
+            digest = hashlib.sha1(data).hexdigest()
+
+        self.cells = cells
+        self.digest = digest  # program hash
+        self.metadata = metadata if metadata is not None else {}
+        self.path = None  # image file that the cells are mapped from
+        self.offset = 0  # position of the cells within that file
+
+        self.decoded = {}  # decoded instructions by the optimization flag and their address
+        self.sources = {}  # compiled block sources and their end by the memory backend type and their entry address
+        self._templates = {}  # pristine memory of every backend, which new memories are forked from
+        self._analysis = None
+
+    def save(self, path: str):
+        """
+        Write the image to a binary file, which consists of a signature, a json header with the metadata,
+        and the cells in a little-endian int64 layout aligned to 8 bytes. Decoded instructions, compiled blocks
+        and the analysis are not stored, because they are code, which must not be loaded from untrusted files.
+        @param path: Path of the image file
+        """
+        if self.cells.dtype == object:
+            raise ValueError("the program holds values beyond the int64 range, which image files cannot store")
 
-        class InputInstrPartial(InputInstr):
-            __init__ = partialmethod(InputInstr.__init__, value=value)
-
-        return InputInstrPartial
+        header = json.dumps({"version": IMAGE_VERSION, "cells": len(self.cells), "digest": self.digest,
+                             "metadata": self.metadata}).encode()
+        header += b" " * (-(len(IMAGE_MAGIC) + 8 + len(header)) % 8)
 
+        with open(path, "wb") as f:
+            f.write(IMAGE_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            f.write(self.cells.astype("<i8").tobytes())
 
-class OutputInstr(Instruction):
+    @staticmethod
+    def open(path: str) -> "ProgramImage":
+        """
+        Load an image file without parsing the program, the cells are memory-mapped,
+        so that all processes which open the same file share their pages
+        @param path: Path of the image file
+        @return: The image, whose instructions are decoded again when they are executed
+        """
+        with open(path, "rb") as f:
+            if f.read(len(IMAGE_MAGIC)) != IMAGE_MAGIC:
+                raise ValueError(f"{path} is not an intcode image file")
 
-    def __init__(self, opcode: int, params: List[int], vm: "IntcodeMachine", buffer: list):
-        super().__init__(opcode, params, vm)
-        self.buffer = buffer
+            size, = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(size))
+            offset = len(IMAGE_MAGIC) + 8 + size
 
-    @classmethod
-    def length(cls) -> int:
-        return 2
+        if header.get("version") != IMAGE_VERSION:
+            raise ValueError(f"{path} has the unsupported image version {header.get('version', 1)}")
 
-    def apply(self):
-        a = self._get_params(1, 0)
-        self.buffer.append(a)
+        image = ProgramImage(np.memmap(path, dtype="<i8", mode="r", offset=offset, shape=(header["cells"],)),
+                             header["digest"], header["metadata"])
+        image.path, image.offset = path, offset
+        return image
 
     @staticmethod
-    def build_output_instruction(buffer: list):
+    def load(memory: Union[np.ndarray, str, "ProgramImage"]) -> "ProgramImage":
+        """
+        @param memory: Program and data memory, or an existing image
+        @return: The image, programs that are given as text are only parsed once
+        """
+        if isinstance(memory, ProgramImage):
+            return memory
+        if isinstance(memory, str):
+            return _parsed_image(memory)
+        return ProgramImage(memory)
+
+    @property
+    def analysis(self) -> "IntcodeAnalysis":
+        """
+        @return: The static analysis of this program, which is computed on first access
+        """
+        if self._analysis is None:
+            from intcodedis import IntcodeAnalysis
+            self._analysis = IntcodeAnalysis(self.cells)
+        return self._analysis
+
+    def create_memory(self, backend: str = "auto") -> PagedMemory:
+        """
+        Create the memory for this image, which shares all pages with other memories of the same backend
+        @param backend: One of the BACKENDS, or "auto", see select_backend()
+        @return: A new memory instance
         """
-        Factory method that returns an output instruction that will write its output to the supplied buffer
-        @param buffer: A list to which output can be appended
-        @return: An instantiable `OutputInstr`
+        backend = select_backend(self.cells, backend)
+        template = self._templates.get(backend)
+        if template is None:
+            template = self._templates[backend] = create_memory(self.cells, backend)
+
+        return template.fork()
+
+    def predecode(self, optimize: bool = True, backend: str = "auto"):
+        """
+        Decode all instructions that the static analysis finds ahead of time, e.g. before the image is sent
+        to worker processes, so that no machine needs to decode them on its own
+        @param optimize: Decode superinstructions like machines that optimize (default: True)
+        @param backend: Memory backend of the machines
         """
+        vm = IntcodeMachine(self, backend=backend, optimize=optimize)
+        for addr in self.analysis.instructions:
+            vm._decode(addr)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __getstate__(self) -> dict:
+        # memory templates are cheap to rebuild, but decoded instructions and the analysis are sent along,
+        # the cells of image files are mapped again by the receiver instead
+        state = self.__dict__.copy()
+        state["_templates"] = {}
+        if self.path is not None:
+            state["cells"] = len(self.cells)
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        if self.path is not None:
+            self.cells = np.memmap(self.path, dtype="<i8", mode="r", offset=self.offset, shape=(state["cells"],))
 
-        class OutputInstrPartial(OutputInstr):
-            __init__ = partialmethod(OutputInstr.__init__, buffer=buffer)
 
-        return OutputInstrPartial
+@lru_cache(maxsize=64)
+def _parsed_image(text: str) -> ProgramImage:
+    return ProgramImage(text)
 
 
-class JmpTrueInstr(Instruction):
+def decode_instruction(memory: Sequence[int], ip: int) -> Tuple[Opcode, List[int], List[int]]:
+    """
+    Decode the instruction at some address
+    @param memory: Program and data memory
+    @param ip: The address of the instruction
+    @return: The opcode, the three parameter modes and the three raw parameters (unused ones are zero)
+    """
+    opcode = int(memory[ip])
+    instrcode = opcode % 100
+    if instrcode not in SIGNATURES:
+        raise ValueError(f"unknown opcode {opcode} at ip = {ip}")
+
+    op = Opcode(instrcode)
+    nin, nout = SIGNATURES[op]
 
-    @classmethod
-    def length(cls) -> int:
-        return 3
+    # decode parameter modes and fetch the raw parameters
+    modes = [opcode // (10 ** (i + 2)) % 10 for i in range(3)]
+    params = [int(memory[ip + 1 + i]) if i < nin + nout else 0 for i in range(3)]
 
-    def apply(self):
-        a, b = self._get_params(2, 0)
-        if a != 0:
-            return b  # ip := b
+    if any(mode not in _MODES for mode in modes[:nin + nout]):
+        raise ValueError(f"unknown parameter mode in instruction {opcode} at ip = {ip}")
 
+    # output parameters are always memory addresses because they will be written
+    if any(mode == Mode.IMMEDIATE for mode in modes[nin:nin + nout]):
+        raise ValueError(f"unsupported immediate mode for instruction {opcode} at ip = {ip}")
 
-class JmpFalseInstr(Instruction):
+    return op, modes, params
 
-    @classmethod
-    def length(cls) -> int:
-        return 3
 
-    def apply(self):
-        a, b = self._get_params(2, 0)
-        if a == 0:
-            return b  # ip := b
+# maximum number of instructions that are compiled into a single block
+BLOCK_LIMIT = 64
 
+# blocks that were patched and compiled again this often are interpreted from then on
+RECOMPILE_LIMIT = 4
 
-class LessThanInstr(Instruction):
+# instructions that end a basic block
+TERMINATORS = {Opcode.INPUT, Opcode.OUTPUT, Opcode.JMP_TRUE, Opcode.JMP_FALSE, Opcode.HALT}
 
-    @classmethod
-    def length(cls) -> int:
-        return 4
+# operators of the arithmetic and comparison instructions
+_OPERATORS = {
+    Opcode.ADD: "{} + {}",
+    Opcode.MUL: "{} * {}",
+    Opcode.LESS_THAN: "1 if {} < {} else 0",
+    Opcode.EQUALS: "1 if {} == {} else 0"
+}
+
+
+def generate_block(memory: PagedMemory, entry: int) -> Tuple[str, int]:
+    """
+    Translate the basic block that starts at some address into Python source code.
+    The source defines a factory `make(vm, pages, owners, read, write, invalidate, receive, send)` that returns
+    a function, which executes the block and returns the next instruction pointer, or a negative value to stop.
+    @param memory: Program and data memory
+    @param entry: The address of the first instruction
+    @return: The source code and the address after the last instruction of the block
+    """
 
-    def apply(self):
-        a, b, c = self._get_params(2, 1)
-        self.vm.memory[c] = int(a < b)
+    body = ["base = vm.base"]
+    scalar = "{}" if memory.native else "int({})"
+    # was the relative base modified so far, how many instructions started, and how deep are we nested?
+    state = {"base": False, "count": 0, "indent": ""}
+
+    def emit(line: str):
+        body.append(state["indent"] + line)
+
+    def leave(result: str, indent: str = "", retry: bool = False):
+        if state["base"]:
+            emit(f"{indent}vm.base = base")
+        # count all instructions so far, unless the current one will be executed again
+        emit(f"{indent}vm.steps += {state['count'] - retry}")
+        emit(f"{indent}return {result}")
+
+    def address(mode: int, param: int) -> str:
+        if mode == _POSITION:
+            return str(param)
+        emit(f"addr = base + {param}")
+        return "addr"
+
+    def cell(addr: str) -> str:
+        if addr.isdigit():
+            return f"pages[{int(addr) >> PAGE_BITS}][{int(addr) & PAGE_MASK}]"
+        return f"pages[{addr} >> {PAGE_BITS}][{addr} & {PAGE_MASK}]"
+
+    def guard(addr: str):
+        # negative addresses would wrap around to the last pages, so they are rejected just like the memory does
+        if addr == "addr":
+            emit("if addr < 0:")
+            emit('    raise IndexError(f"negative memory address {addr}")')
+        elif int(addr) < 0:
+            emit(f'raise IndexError("negative memory address {addr}")')
+
+    def load(var: str, mode: int, param: int) -> str:
+        if mode == _IMMEDIATE:
+            return str(param)
+
+        addr = address(mode, param)
+        guard(addr)
+        emit("try:")
+        emit(f"    {var} = {scalar.format(cell(addr))}")
+        emit("except IndexError:")
+        emit(f"    {var} = read({addr})")
+        return var
+
+    def store(mode: int, param: int, value: str, following: int):
+        if value != "value":
+            emit(f"value = {value}")
+        addr = address(mode, param)
+        guard(addr)
+        emit("try:")
+        emit(f"    {cell(addr)} = value")
+        emit("except (IndexError, ValueError, TypeError, OverflowError):")
+        emit(f"    if write({addr}, value):")
+        leave(str(following), "        ")  # the page table was replaced, which this block still refers to
+
+        # leave the block if we just overwrote decoded code, which might be this very block
+        emit(f"if {addr} in owners:")
+        emit(f"    invalidate({addr})")
+        leave(str(following), "    ")
+
+    ip, op = entry, None
+    for _ in range(BLOCK_LIMIT):
+        try:
+            op, modes, params = decode_instruction(memory, ip)
+        except ValueError:
+            if ip == entry:
+                raise
+            break  # the dispatcher will raise the error if the instruction is ever reached
+
+        following = ip + LENGTHS[op]
+        (ma, mb, mc), (a, b, c) = modes, params
+        emit(f"# {ip}: {op.name} {' '.join(map(str, params[:LENGTHS[op] - 1]))}")
+        state["count"] += 1
+
+        if op in _OPERATORS:
+            x, y = load("a", ma, a), load("b", mb, b)
+            store(mc, c, _OPERATORS[op].format(x, y), following)
+        elif op == Opcode.INPUT:
+            emit("value = receive()")
+            emit("if value is None:")
+            emit(f"    vm.ip = {ip}")
+            leave("-1", "    ", retry=True)
+            store(ma, a, "value", following)
+        elif op == Opcode.OUTPUT:
+            emit(f"if send({load('a', ma, a)}):")
+            emit(f"    vm.ip = {following}")
+            leave("-1", "    ")
+        elif op in (Opcode.JMP_TRUE, Opcode.JMP_FALSE):
+            emit(f"if {load('a', ma, a)} {'!=' if op == Opcode.JMP_TRUE else '=='} 0:")
+
+            # the target is only loaded if the jump is taken, just like the interpreter does
+            state["indent"] = "    "
+            y = load("b", mb, b)
+            # negative values stop the dispatcher, so they must never be returned as the next instruction pointer
+            if mb != _IMMEDIATE:
+                emit(f"if {y} < 0:")
+                emit(f'    raise IndexError(f"negative instruction pointer {{{y}}}")')
+            elif b < 0:
+                emit(f'raise IndexError("negative instruction pointer {b}")')
+            leave(y)
+            state["indent"] = ""
+            leave(str(following))
+        elif op == Opcode.BASE_OFFSET:
+            emit(f"base += {load('a', ma, a)}")
+            state["base"] = True
+        elif op == Opcode.HALT:
+            emit(f"vm.ip = {ip}")
+            emit("vm.done = True")
+            leave("-1")
+
+        ip = following
+        if op in TERMINATORS:
+            break
+
+    if op not in (Opcode.JMP_TRUE, Opcode.JMP_FALSE, Opcode.HALT):
+        leave(str(ip))
+
+    source = ["def make(vm, pages, owners, read, write, invalidate, receive, send):", "    def block():"]
+    source += ["        " + line for line in body]
+    source += ["    return block"]
+    return "\n".join(source) + "\n", ip
+
+
+@lru_cache(maxsize=4096)
+def _block_factory(source: str) -> Callable:
+    namespace = {}
+    exec(compile(source, "<intcode block>", "exec"), namespace)
+    return namespace["make"]
+
+
+# the instruction budget of runs without a budget
+UNLIMITED = sys.maxsize
+
+# runs with a deadline check the clock after this many instructions
+DEADLINE_SLICE = 1 << 14
+
+# maximum number of warm states that are cached per program image
+WARM_STATES = 4096
+
+
+@lru_cache(maxsize=64)
+def _warm_states(backend: type, digest: str, ascii: bool) -> dict:
+    # warm states of a program image by the input prefix that was consumed to reach them,
+    # machines in ascii mode keep separate states, because their outputs partly went to the text buffer
+    return {}
+
+
+# longest loop body in instructions that is considered for fast-forwarding, and the fewest iterations worth it
+LOOP_LIMIT = 16
+LOOP_MIN_TRIPS = 16
+
+# instructions that were patched and decoded again this often are no longer fused into superinstructions
+REDECODE_LIMIT = 4
+
+
+def _first_exit(d0: int, stride: int, equals: bool, proceed: bool) -> Optional[int]:
+    # first iteration i >= 0 of a loop that continues as long as the comparison d(i) == 0, or d(i) < 0,
+    # equals proceed, where d(i) = d0 + stride * i, or None if the loop never exits
+    if equals:
+        if proceed:
+            return 0 if d0 != 0 else (1 if stride != 0 else None)
+        if d0 == 0:
+            return 0
+        if stride == 0 or -d0 % stride != 0 or -d0 // stride < 0:
+            return None
+        return -d0 // stride
 
+    if proceed:
+        if d0 >= 0:
+            return 0
+        return (-d0 + stride - 1) // stride if stride > 0 else None
 
-class EqualsInstr(Instruction):
+    if d0 < 0:
+        return 0
+    return d0 // -stride + 1 if stride < 0 else None
 
-    @classmethod
-    def length(cls) -> int:
-        return 4
 
-    def apply(self):
-        a, b, c = self._get_params(2, 1)
-        self.vm.memory[c] = int(a == b)
+# version of the checkpoint format, which is only increased on incompatible changes
+CHECKPOINT_VERSION = 1
 
+# a checkpoint, its json serialization, or the path of a checkpoint file
+CheckpointSource = Union[dict, bytes, str]
 
-class BaseOffsetInstr(Instruction):
 
-    @classmethod
-    def length(cls) -> int:
-        return 2
+def _read_checkpoint(checkpoint: CheckpointSource) -> dict:
+    # parse serialized checkpoints and check their format
+    if isinstance(checkpoint, str):
+        with open(checkpoint, "rb") as f:
+            checkpoint = f.read()
+    if isinstance(checkpoint, bytes):
+        checkpoint = json.loads(checkpoint)
 
-    def apply(self):
-        a = self._get_params(1, 0)
-        self.vm.base += a
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"unsupported checkpoint version {checkpoint.get('version')}")
+    return checkpoint
 
 
 class IntcodeMachine(object):
 
-    def __init__(self, memory: Union[np.ndarray, str], inputs: List[int] = None):
+    def __init__(self, memory: Union[np.ndarray, str, ProgramImage], inputs: List[int] = None,
+                 backend: str = "auto", engine: str = "interpreter", optimize: bool = True, warm: int = None,
+                 cache: "RunCache" = None, ascii: bool = False):
         """
         Create a new IntCode virtual machine with a given program and data memory and an optional input buffer
-        @param memory: Program and data memory
+        @param memory: Program and data memory, or a shared program image
         @param inputs: Input buffer for input instructions
+        @param backend: Memory backend, either "list", "numpy" or "auto" (default), numpy memory is replaced
+                        by list memory as soon as a value beyond the int64 range is written
+        @param engine: Execution engine, either "interpreter" (default) or "compiler" for compiled basic blocks
+        @param optimize: Let the interpreter fuse common instruction pairs into superinstructions (default: True)
+        @param warm: Start runs from cached states that all machines of the same program share, 0 caches the state
+                     at the first input instruction, k also caches the states after each of the first k inputs
+                     (default: None, which always starts from scratch)
+        @param cache: Look up and store the results of runs with nopause=True in an intcodecache.RunCache,
+                      a cached run reproduces the outputs, consumes the inputs and restores the final state
+        @param ascii: Collect output values from 0 to 255 in the text buffer instead of the output buffer,
+                      which then only receives values that are no characters, e.g. the final answer
         """
+        if engine not in ENGINES:
+            raise ValueError(f"unknown execution engine {engine}")
 
-        self.memory = memory if isinstance(memory, np.ndarray) else self.parse_memory(memory)  # program and data
+        self.image = ProgramImage.load(memory)
+        self.memory = self.image.create_memory(backend)  # program and data
         self.ip = 0  # instruction pointer
         self.base = 0  # relative base
         self.done = False  # are we finished yet?
-        self.inputs = inputs if inputs is not None else []  # input buffer
-        self.outputs = []  # output buffer
-
-        # increase memory size
-        self.memory = np.pad(self.memory, (0, int(1E4)), "constant")
-        self._backup = self.memory.copy()
-        self._backup.flags.writeable = False
-
-        # opcode to instruction mapping
-        self._mapping = {
-            Opcode.HALT: HaltInstr,
-            Opcode.ADD: AddInstr,
-            Opcode.MUL: MulInstr,
-            Opcode.INPUT: None,  # created dynamically
-            Opcode.OUTPUT: OutputInstr.build_output_instruction(self.outputs),
-            Opcode.JMP_TRUE: JmpTrueInstr,
-            Opcode.JMP_FALSE: JmpFalseInstr,
-            Opcode.LESS_THAN: LessThanInstr,
-            Opcode.EQUALS: EqualsInstr,
-            Opcode.BASE_OFFSET: BaseOffsetInstr
-        }
+        self.inputs = deque(inputs if inputs is not None else [])  # input buffer
+        self.outputs = deque()  # output buffer
+        self.text = bytearray() if ascii else None  # text buffer of ascii mode
+        self.on_input = None  # optional input provider, which is asked for a value if the input buffer is empty
+        self.on_output = None  # optional output consumer, which receives all values instead of the output buffer
+        self.engine = engine
+        self.optimize = optimize
+        self.fusions = 0  # number of instruction pairs that were fused into superinstructions
+        self.skipped = 0  # number of instructions that were skipped by fast-forwarding counting loops
+        self.profiler = None  # optional IntcodeProfiler, which is notified about every executed instruction
+        self.recorder = None  # optional IntcodeRecorder, which logs all inputs and outputs
+        self.replay = None  # optional IntcodeRecorder, whose log is served instead of executing instructions
+        self.steps = 0  # total number of executed instructions
+        self.status = None  # why the last run stopped
+        self.warm = warm
+        self.cache = cache
+        self.digest = self.image.digest
+        self._streaming = False  # pause after every output value?
+        self._linewise = False  # pause after every line break in the text buffer?
+        self._target = -1  # pause after this many output values, if it is not negative
+        self._emitted = 0  # number of output values in the current run
+        self._fresh = True  # is the machine in its original state, with an unmodified program?
+        self._cursor = 0  # position of the next event of the replayed log
+        self._budgeted = False  # does the current run have an instruction budget?
+        self._warm_states = _warm_states(type(self.memory), self.digest, ascii) if warm is not None else None
+
+        # the hot path accesses the page table directly and only falls back to the memory on page faults
+        self._pages = self.memory.pages
+        self.memory.on_write = self._patched
+
+        # decoded instructions or compiled blocks by their entry address, the address after their last cell,
+        # and the entry addresses of all cached code that covers some memory cell
+        self._code = {}
+        self._extent = {}
+        self._owners = {}
+        self._recompiles = {}  # number of blocks that were compiled from patched memory by their entry address
+        self._redecodes = {}  # number of instructions that were decoded from patched memory by their address
 
     def reset(self):
         """
@@ -288,40 +885,327 @@ class IntcodeMachine(object):
         self.ip = 0
         self.base = 0
         self.done = False
-        self.inputs = []
-        self.outputs = []
-        self.memory = self._backup.copy()
-        self._mapping[Opcode.OUTPUT] = OutputInstr.build_output_instruction(self.outputs)
+        self.status = None
+        self.inputs.clear()
+        self.outputs.clear()
+        if self.text is not None:
+            self.text.clear()
+        self._fresh = True
+
+        # cached code stays valid unless it was derived from a page that was written
+        for page in self.memory.reset():
+            self._invalidate_page(page)
+
+    def snapshot(self) -> MachineState:
+        """
+        Capture the state of the machine, memory pages are shared with the snapshot until they are written again
+        @return: The instruction pointer, relative base, buffers, memory content and instruction counter
+        """
+        return MachineState(self.ip, self.base, self.done, tuple(self.inputs), tuple(self.outputs),
+                            self.memory.snapshot(), bytes(self.text) if self.text is not None else None, self.steps)
 
-    def execute(self, inputs: Sequence[int] = None, nopause=False, noutputs=1, pop=False) -> int:
+    def restore(self, state: MachineState):
         """
-        Interpret the instructions and finally return the last output value
-        @param inputs: Fill the input buffer with these values
+        Revert the machine to a snapshot, which can be restored again later on, callbacks are kept
+        @param state: A snapshot of this machine or of a machine with the same memory backend
+        """
+        self.ip, self.base, self.done, self.steps = state.ip, state.base, state.done, state.steps
+        self._fresh = False
+        self.inputs.clear()
+        self.inputs.extend(state.inputs)
+        self.outputs.clear()
+        self.outputs.extend(state.outputs)
+        if self.text is not None:
+            self.text[:] = state.text or b""
+
+        # snapshots from before the machine switched to list memory need to be converted
+        memory = state.memory
+        if self.memory.native and any(isinstance(page, np.ndarray) for page in memory.pages):
+            narrow = self.image.create_memory("numpy")
+            narrow.restore(memory)
+            changed = self.memory.adopt(narrow)
+        else:
+            if not self.memory.native and not all(isinstance(page, np.ndarray) for page in memory.pages):
+                self._widen()  # a snapshot of list memory might hold values beyond the int64 range
+                return self.restore(state)
+            changed = self.memory.restore(memory)
+
+        # only drop cached code from pages that actually differ from the snapshot
+        for page in changed:
+            self._invalidate_page(page)
+
+    def fork(self) -> "IntcodeMachine":
+        """
+        Create an independent copy of the machine that continues from the current state,
+        both machines share all memory pages and copy them on their first write
+        @return: The copy, without input and output callbacks
+        """
+        clone = copy(self)
+        clone.memory = self.memory.fork()
+        clone.memory.on_write = clone._patched
+        clone._pages = clone.memory.pages
+        clone.inputs = deque(self.inputs)
+        clone.outputs = deque(self.outputs)
+        clone.text = bytearray(self.text) if self.text is not None else None
+        clone.on_input = None
+        clone.on_output = None
+        clone.recorder = None
+
+        # decoded instructions are plain tuples that can be shared, but compiled blocks are bound to their machine
+        clone._code, clone._extent, clone._owners = {}, {}, {}
+        clone._recompiles, clone._redecodes = dict(self._recompiles), dict(self._redecodes)
+        if self.engine != "compiler":
+            clone._code.update(self._code)
+            clone._extent.update(self._extent)
+            clone._owners.update((addr, set(entries)) for addr, entries in self._owners.items())
+
+        return clone
+
+    def checkpoint(self) -> dict:
+        """
+        Capture the state of the machine in a stable, json-serializable format, which does not depend on the
+        memory backend or the engine. Memory is stored as the cells that differ from the program image.
+        @return: The registers, the input and output buffers, and the modified memory cells
+        """
+        return {
+            "version": CHECKPOINT_VERSION,
+            "digest": self.digest,
+            "image": self.image.path,  # image file of the program, if there is one
+            "ip": self.ip,
+            "base": self.base,
+            "done": self.done,
+            "steps": self.steps,
+            "status": self.status.name if self.status is not None else None,
+            "inputs": list(self.inputs),
+            "outputs": list(self.outputs),
+            "text": self.text.decode("latin-1") if self.text is not None else None,
+            "memory": sorted(self.memory.diff().items())
+        }
+
+    def suspend(self, path: str = None) -> bytes:
+        """
+        Serialize a checkpoint of the machine, e.g. to send it to another process, see checkpoint()
+        @param path: Optionally, also write the checkpoint to this file, which is replaced atomically,
+                     so that the previous checkpoint survives a crash during the write
+        @return: The json serialization of the checkpoint
+        """
+        data = json.dumps(self.checkpoint(), separators=(",", ":")).encode()
+        if path is not None:
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+
+        return data
+
+    @staticmethod
+    def resume(checkpoint: CheckpointSource, memory: Union[np.ndarray, str, ProgramImage] = None,
+               **options) -> "IntcodeMachine":
+        """
+        Create a machine that continues from a checkpoint, e.g. one that was suspended by another process
+        @param checkpoint: A checkpoint, its json serialization, or the path of a checkpoint file
+        @param memory: Program and data memory, or a shared program image, which can be omitted
+                       if the checkpoint was taken from a machine whose program was opened from an image file
+        @param options: Further keyword arguments for the IntcodeMachine constructor
+        @return: The machine
+        """
+        checkpoint = _read_checkpoint(checkpoint)
+        if memory is None:
+            if checkpoint["image"] is None:
+                raise ValueError("the checkpoint does not refer to an image file, so the program is needed")
+            memory = ProgramImage.open(checkpoint["image"])
+
+        vm = IntcodeMachine(memory, **options)
+        vm.load_checkpoint(checkpoint)
+        return vm
+
+    def load_checkpoint(self, checkpoint: CheckpointSource):
+        """
+        Revert the machine to a checkpoint of the same program, callbacks are kept
+        @param checkpoint: A checkpoint, its json serialization, or the path of a checkpoint file
+        """
+        checkpoint = _read_checkpoint(checkpoint)
+        if checkpoint["digest"] != self.digest:
+            raise ValueError("the checkpoint was taken from a machine with a different program")
+
+        text = checkpoint.get("text")
+        self.restore(MachineState(checkpoint["ip"], checkpoint["base"], checkpoint["done"],
+                                  tuple(checkpoint["inputs"]), tuple(checkpoint["outputs"]),
+                                  self._modified(checkpoint["memory"]),
+                                  text.encode("latin-1") if text is not None else None, checkpoint["steps"]))
+        self.status = Status[checkpoint["status"]] if checkpoint["status"] is not None else None
+
+    def _modified(self, cells: Sequence[Tuple[int, int]]) -> MemoryState:
+        # apply the modified cells to a pristine memory, which only needs arbitrary precision for huge values
+        memory = self.memory.fork()
+        memory.reset()
+        try:
+            for addr, value in cells:
+                memory.write(addr, value)
+        except OverflowError:
+            memory = self.image.create_memory("list")
+            for addr, value in cells:
+                memory.write(addr, value)
+
+        return memory.snapshot()
+
+    def execute(self, inputs: Sequence[int] = None, nopause=False, noutputs=1, pop=False,
+                steps: int = None, outputs: int = None, deadline: float = None) -> int:
+        """
+        Interpret the instructions and finally return the last output value, the reason why the execution stopped
+        is stored in the status attribute
+        @param inputs: Fill the input buffer with these values, or with the characters of some text
         @param nopause: Avoid forced halts due to missing inputs
         @param noutputs: After the execution stopped, retrieve the last noutputs (default: 1) output values
         @param pop: When returning the last output value, also pop the value from the buffer
+        @param steps: Optional instruction budget, see run()
+        @param outputs: Optionally stop after this many output values, see run()
+        @param deadline: Optionally stop at this time.monotonic() value, see run()
         @return: The last value that was written by an output instruction
         """
 
         if inputs is not None:
-            self.inputs.extend(inputs)
-
-        while self.ip < len(self.memory):
-            instr = self._parse_instruction()
-            if isinstance(instr, HaltInstr):
-                self.done = type(instr) == HaltInstr  # we are only done on "real" halt instructions
-                break
+            self.feed(inputs)
 
-            result = instr.apply()
-
-            # increase ip by instruction length by default - or set it to the instruction result
-            self.ip = self.ip + instr.length() if result is None else result
+        # non-interactive runs of an unmodified program only depend on the input values
+        unlimited = steps is None and outputs is None and deadline is None
+        if nopause and unlimited and self.cache is not None and self._fresh \
+                and self.on_input is None and self.on_output is None and self.recorder is None and self.text is None:
+            self._run_cached()
+        else:
+            self.run(steps=steps, outputs=outputs, deadline=deadline)
 
-        if nopause and not self.done:
+        if nopause and self.status == Status.WAITING:
             raise RuntimeError(f"vm execution stopped at ip = {self.ip} because the input buffer was empty")
 
         return self.get_output(n=noutputs, pop=pop)
 
+    def run(self, inputs: Sequence[int] = None, steps: int = None, outputs: int = None,
+            deadline: float = None) -> Status:
+        """
+        Execute the program until it halted, the input buffer is empty, or some limit is reached
+        @param inputs: Fill the input buffer with these values
+        @param steps: Optional instruction budget, which is checked between compiled blocks and superinstructions,
+                      so that it might be exceeded by the rest of a basic block with the compiler, and by the second
+                      instruction of a superinstruction with the interpreter
+        @param outputs: Optionally stop as soon as this many output values were written
+        @param deadline: Optionally stop once time.monotonic() reaches this value,
+                         which is checked every DEADLINE_SLICE instructions
+        @return: Why the execution stopped, which is also stored in the status attribute
+        """
+
+        if inputs is not None:
+            self.feed(inputs)
+
+        end = self.steps + steps if steps is not None else None
+        self._target = outputs if outputs is not None else -1
+        self._emitted = 0
+        self._budgeted = end is not None  # loops can not be fast-forwarded beyond the budget
+
+        try:
+            while True:
+                if end is not None and self.steps >= end:
+                    self.status = Status.BUDGET
+                    return self.status
+                if deadline is not None and monotonic() >= deadline:
+                    self.status = Status.DEADLINE
+                    return self.status
+
+                limit = UNLIMITED if deadline is None else DEADLINE_SLICE
+                if end is not None:
+                    limit = min(limit, end - self.steps)
+
+                if not self._run(limit):
+                    break  # the machine stopped on its own
+        finally:
+            self._target = -1
+            self._budgeted = False
+
+        if self.done:
+            self.status = Status.HALTED
+        elif outputs is not None and self._emitted >= outputs:
+            self.status = Status.OUTPUTS
+        else:
+            self.status = Status.WAITING
+
+        return self.status
+
+    def stream(self, inputs: Sequence[int] = None) -> Iterator[int]:
+        """
+        Execute the program and yield every output value as soon as it was written,
+        the generator stops when the machine halted or the input buffer is empty,
+        characters of ascii mode are collected in the text buffer instead
+        @param inputs: Fill the input buffer with these values
+        """
+
+        if inputs is not None:
+            self.feed(inputs)
+
+        while not self.done:
+            self._emitted = 0
+            try:
+                self._streaming = True
+                self._run()
+            finally:
+                self._streaming = False
+
+            while self.outputs:
+                yield self.outputs.popleft()
+
+            if self._emitted == 0:
+                break  # paused because of an empty input buffer
+
+    def lines(self, inputs: Union[str, bytes, Sequence[int]] = None) -> Iterator[str]:
+        """
+        Execute the program in ascii mode and yield every line of text as soon as it was completed,
+        the generator stops when the machine halted or the input buffer is empty,
+        an unfinished line is kept in the text buffer
+        @param inputs: Fill the input buffer with these values, or with the characters of some text
+        """
+        if self.text is None:
+            raise RuntimeError("lines can only be read in ascii mode")
+        if inputs is not None:
+            self.feed(inputs)
+
+        while True:
+            try:
+                self._linewise = True
+                self._run()
+            finally:
+                self._linewise = False
+
+            end = self.text.rfind(b"\n") + 1
+            if end == 0:
+                break  # paused because of an empty input buffer, or halted
+
+            text = self.text[:end].decode("latin-1")
+            del self.text[:end]
+            yield from text.splitlines()
+
+            if self.done:
+                break
+
+    def feed(self, inputs: Union[str, bytes, Sequence[int]]) -> "IntcodeMachine":
+        """
+        Append values to the input buffer, text is appended with one value per character
+        @param inputs: Values, or some text, e.g. a command script of a text-based program
+        @return: The machine itself
+        """
+        self.inputs.extend(inputs.encode("latin-1") if isinstance(inputs, str) else inputs)
+        return self
+
+    def read_text(self, pop: bool = True) -> str:
+        """
+        @param pop: Also clear the text buffer (default: True)
+        @return: All text that was written in ascii mode so far
+        """
+        if self.text is None:
+            raise RuntimeError("text can only be read in ascii mode")
+
+        text = self.text.decode("latin-1")
+        if pop:
+            self.text.clear()
+        return text
+
     def get_output(self, n=1, pop=False) -> Union[None, int, List[int]]:
         """
         Retrieve the last n (default: 1) output values
@@ -333,36 +1217,647 @@ class IntcodeMachine(object):
         if n == 0 or len(self.outputs) < n:
             return None
 
-        view = self.outputs[-n:] if n > 1 else self.outputs[-1]
+        view = list(islice(self.outputs, len(self.outputs) - n, None)) if n > 1 else self.outputs[-1]
 
         if pop:
-            del self.outputs[-n:]
+            for _ in range(n):
+                self.outputs.pop()
 
         return view
 
-    def _parse_instruction(self) -> Instruction:
-        opcode = self.memory[self.ip]
-        instrcode = opcode % 100
-        if instrcode not in self._mapping:
-            raise ValueError(f"unknown opcode {opcode} at ip = {self.ip}")
+    def _run(self, limit: int = UNLIMITED) -> bool:
+        # execute at most limit instructions and tell whether we stopped because of that limit
+        if self._fresh:
+            self._fresh = False
+            if self._warm_states is not None and limit == UNLIMITED and self._target < 0 and self.recorder is None:
+                self._warm_start()
+                if self.done:
+                    return False  # the warm-up already reached the end, so the halt must not be executed again
+
+        if self.replay is not None:
+            return self._run_replayed(limit)
+        if self.recorder is None:
+            return self._run_engine(limit)
+
+        # log the number of executed instructions after every run, when the machine is in a consistent state
+        steps = self.steps
+        exhausted = self._run_engine(limit)
+        self.recorder.mark(self, self.steps - steps)
+        return exhausted
+
+    def _run_engine(self, limit: int) -> bool:
+        if self.profiler is not None:
+            return self._run_profiled(limit)
+        elif self.engine == "compiler":
+            return self._run_compiled(limit)
+        else:
+            return self._run_interpreted(limit)
+
+    def _run_cached(self):
+        # continue from the final state of the cached run, as if the machine had executed it
+        given, start = tuple(self.inputs), self.steps
+        result = self.cache.get(self.digest, given)
+        if result is not None:
+            self.restore(MachineState(result.ip, result.base, True, given[result.consumed:],
+                                      tuple(self.outputs) + result.outputs, self._modified(result.memory),
+                                      None, start + result.steps))
+            self.status = Status.HALTED
+            return
+
+        self.run()
+        if self.done:
+            memory = tuple(sorted(self.memory.diff().items()))
+            self.cache.put(self.digest, given, (tuple(self.outputs), len(given) - len(self.inputs), self.ip, self.base,
+                                                self.steps - start, memory))
+
+    def _warm_start(self):
+        # everything up to an input instruction only depends on the inputs that were consumed so far,
+        # so we continue from the cached state after the longest known prefix of the input buffer
+        pending = list(self.inputs)
+        prefix = tuple(pending[:self.warm])
+        states = self._warm_states
+        known = next((k for k in range(len(prefix), -1, -1) if prefix[:k] in states), None)
+
+        # run without callbacks and pauses, so that the state only depends on the program and the prefix
+        callbacks = self.on_input, self.on_output, self._streaming
+        self.on_input, self.on_output, self._streaming = None, None, False
+        self.inputs.clear()
+
+        # cached states count the instructions since the fresh start, but the counter survives resets
+        k, start = 0, self.steps
+        try:
+            if known is None:
+                self._run()
+                self._remember((), start)
+            else:
+                k = known
+                self.restore(states[prefix[:k]])
+                self.steps += start
+
+            while k < len(prefix) and not self.done:
+                self.inputs.append(prefix[k])
+                self._run()
+                k += 1
+                self._remember(prefix[:k], start)
+        finally:
+            self.on_input, self.on_output, self._streaming = callbacks
+            self.inputs.extend(pending[k:])
+
+        # hand outputs of the warm-up over to the consumer, just like a cold run would have done
+        if self.on_output is not None:
+            while self.outputs:
+                self.on_output(self.outputs.popleft())
+
+    def _remember(self, prefix: Tuple[int, ...], start: int):
+        if prefix not in self._warm_states and len(self._warm_states) < WARM_STATES:
+            self._warm_states[prefix] = self.snapshot()._replace(steps=self.steps - start)
+
+    def _receive(self) -> Optional[int]:
+        # next input value, or None if we need to pause
+        if self.inputs:
+            value = self.inputs.popleft()
+        elif self.on_input is not None:
+            value = self.on_input()
+        else:
+            return None
 
-        # build input instructions dynamically or halt if no input is available
-        if instrcode == Opcode.INPUT:
-            cls = InputInstr.build_input_instruction(self.inputs.pop(0)) \
-                if len(self.inputs) > 0 else HaltInstrInternal
+        if self.recorder is not None and value is not None:
+            self.recorder.record(EVENT_INPUT, value)
+        return value
+
+    def _send(self, value: int) -> bool:
+        # pass an output value on and tell whether we need to pause
+        if self.recorder is not None:
+            self.recorder.record(EVENT_OUTPUT, value)
+        if self.on_output is not None:
+            self.on_output(value)
+        elif self.text is not None and 0 <= value < 256:
+            self.text.append(value)
+        else:
+            self.outputs.append(value)
+
+        self._emitted += 1
+        return self._streaming or self._emitted == self._target or (self._linewise and value == 10)
+
+    def _run_interpreted(self, limit: int) -> bool:
+        code, ip, n = self._code, self.ip, 0
+        # superinstructions count their further instructions on their own, so dispatches can not be compared
+        # against the budget, but self.steps + n is the exact number of executed instructions
+        unlimited, end = limit == UNLIMITED, self.steps + limit
+        try:
+            while ip >= 0 and (unlimited or self.steps + n < end):
+                self.ip = ip
+                instr = code.get(ip)
+                if instr is None:
+                    instr = self._decode(ip)
+
+                # handlers return the next instruction pointer, or a negative value to stop
+                ip = instr[0](self, ip, instr)
+                n += 1
+        finally:
+            self.steps += n
+
+        return self._exhausted(ip)
+
+    def _run_compiled(self, limit: int) -> bool:
+        code, ip = self._code, self.ip
+        end = self.steps + limit if limit != UNLIMITED else UNLIMITED
+        while ip >= 0 and self.steps < end:
+            self.ip = ip
+            block = code.get(ip)
+            if block is None:
+                block = self._compile(ip)
+
+            # blocks return the next instruction pointer, or a negative value to stop, and count their instructions
+            ip = block()
+
+        return self._exhausted(ip)
+
+    def _run_profiled(self, limit: int) -> bool:
+        # decode and time every instruction on its own, which bypasses cached code and is the same for all engines
+        profiler, memory, ip, n = self.profiler, self.memory, self.ip, 0
+        try:
+            while ip >= 0 and n < limit:
+                self.ip = ip
+                profiler.trace.append((ip, memory.read(ip), self.base))
+
+                op, (ma, mb, mc), (a, b, c) = decode_instruction(memory, ip)
+                instr = (_HANDLERS[op], LENGTHS[op], ma, a, mb, b, mc, c)
+
+                start = perf_counter()
+                following = instr[0](self, ip, instr)
+                profiler.record(op, ip, (ma, mb, mc), perf_counter() - start)
+                ip = following
+                n += 1
+        finally:
+            self.steps += n
+
+        return self._exhausted(ip)
+
+    def _run_replayed(self, limit: int) -> bool:
+        # serve inputs and outputs from the log, the inputs need to match the recorded ones
+        kinds, values = self.replay.kinds, self.replay.values
+        while self._cursor < len(kinds):
+            kind, value = kinds[self._cursor], values[self._cursor]
+            if kind == EVENT_INPUT:
+                received = self._receive()
+                if received is None:
+                    return False  # pause until more input is available
+                if received != value:
+                    raise RuntimeError(f"replay diverged at event {self._cursor}, "
+                                       f"received input {received} but {value} was recorded")
+
+            self._cursor += 1
+            if kind == EVENT_OUTPUT and self._send(value):
+                return False  # pause, so that the value can be streamed
+            if kind == EVENT_STEPS:
+                self.steps += value
+                if limit != UNLIMITED:
+                    return True  # let the caller check its budget
+
+        # the log is exhausted, so continue from the state at the end of the recording
+        replay, self.replay = self.replay, None
+        replay.resume(self)
+        return not self.done and self._run(limit)
+
+    def _exhausted(self, ip: int) -> bool:
+        # remember where to continue if the instruction limit stopped the machine
+        if ip >= 0:
+            self.ip = ip
+            return True
+
+        return False
+
+    def _decode(self, ip: int) -> Decoded:
+        # reuse instructions that were decoded from the image by some other machine, as long as they are unmodified
+        key = (self.optimize, ip)
+        instr = self.image.decoded.get(key)
+        if instr is not None and self._pristine(ip, ip + instr[1]):
+            if instr[0] in _FUSED:
+                self.fusions += 1
         else:
-            cls = self._mapping[instrcode]
+            op, (ma, mb, mc), (a, b, c) = decode_instruction(self.memory, ip)
+            instr = (_HANDLERS[op], LENGTHS[op], ma, a, mb, b, mc, c)
+            # self-modifying code would be searched for superinstructions after every patch, which is not worth it
+            redecodes = self._redecodes.get(ip, 0)
+            if self.optimize and redecodes < REDECODE_LIMIT:
+                instr = self._induction(ip, self._fuse(ip, op, instr))
+            if self._pristine(ip, ip + instr[1]):
+                self.image.decoded[key] = instr
+            else:
+                self._redecodes[ip] = redecodes + 1
+
+        self._cache(ip, ip + instr[1], instr)
+        return instr
+
+    def _fuse(self, ip: int, op: Opcode, instr: Decoded) -> Decoded:
+        # peek at the following instruction, which does not even need to be code
+        try:
+            following, (fa, fb, fc), (x, y, z) = decode_instruction(self.memory, ip + instr[1])
+        except ValueError:
+            return instr
+
+        # a comparison into some cell, followed by a conditional jump on that very cell
+        _, length, ma, a, mb, b, mc, c = instr
+        if op in (Opcode.LESS_THAN, Opcode.EQUALS) and following in (Opcode.JMP_TRUE, Opcode.JMP_FALSE) \
+                and (fa, x) == (mc, c):
+            self.fusions += 1
+            return (IntcodeMachine._compare_jump, length + LENGTHS[following], ma, a, mb, b, mc, c,
+                    op == Opcode.EQUALS, following == Opcode.JMP_TRUE, fb, y)
+
+        # a relative base adjustment of a call frame, followed by the first instruction that works in that frame
+        if op == Opcode.BASE_OFFSET and following in (Opcode.ADD, Opcode.MUL, Opcode.JMP_TRUE, Opcode.JMP_FALSE):
+            self.fusions += 1
+            second = (_HANDLERS[following], LENGTHS[following], fa, x, fb, y, fc, z)
+            return IntcodeMachine._offset_then, length + LENGTHS[following], ma, a, second
 
-        # initialize instruction
-        params = self.memory[self.ip + 1:self.ip + cls.length()].tolist()
-        instr = cls(opcode, params, self)
         return instr
 
+    def _induction(self, ip: int, instr: Decoded) -> Decoded:
+        # a counting loop that starts here, whose body only consists of additions of some value to a cell
+        # and at most one comparison, and which ends in a conditional jump back to its start
+        adds, compare, addr = [], None, ip
+        for pos in range(LOOP_LIMIT):
+            try:
+                op, (ma, mb, mc), (a, b, c) = decode_instruction(self.memory, addr)
+            except ValueError:
+                return instr
+
+            if op in (Opcode.JMP_TRUE, Opcode.JMP_FALSE):
+                if (mb, b) != (_IMMEDIATE, ip) or ma == _IMMEDIATE or not adds \
+                        or (compare is not None and (ma, a) != compare[6:]):
+                    return instr
+                return (IntcodeMachine._induction_loop, addr + LENGTHS[op] - ip, tuple(adds), compare,
+                        op == Opcode.JMP_TRUE, ma, a, pos + 1, instr)
+
+            if mc == _IMMEDIATE:
+                return instr
+            if op == Opcode.ADD and (ma, a) == (mc, c):
+                adds.append((pos, mc, c, mb, b))
+            elif op == Opcode.ADD and (mb, b) == (mc, c):
+                adds.append((pos, mc, c, ma, a))
+            elif op in (Opcode.LESS_THAN, Opcode.EQUALS) and compare is None:
+                compare = (pos, op == Opcode.EQUALS, ma, a, mb, b, mc, c)
+            else:
+                return instr
+            addr += LENGTHS[op]
+
+        return instr
+
+    def _compile(self, ip: int) -> Callable[[], int]:
+        key = (type(self.memory), ip)
+        cached = self.image.sources.get(key)
+        if cached is not None and self._pristine(ip, cached[1]):
+            source, end = cached
+        else:
+            # self-modifying code would be compiled again after every patch, which costs far more than it saves
+            recompiles = self._recompiles.get(ip, 0)
+            if recompiles >= RECOMPILE_LIMIT:
+                return self._interpret(ip)
+
+            source, end = generate_block(self.memory, ip)
+            if self._pristine(ip, end):
+                self.image.sources[key] = source, end
+            else:
+                self._recompiles[ip] = recompiles + 1
+
+        make = _block_factory(source)
+        block = make(self, self._pages, self._owners, self.memory.read, self._write, self._invalidate,
+                     self._receive, self._send)
+        self._cache(ip, end, block)
+        return block
+
+    def _interpret(self, ip: int) -> Callable[[], int]:
+        # wrap a single decoded instruction, so that it can be dispatched like a compiled block
+        instr = self._decode(ip)
+
+        def block() -> int:
+            following = instr[0](self, ip, instr)
+            self.steps += 1
+            return following
+
+        self._cache(ip, ip + instr[1], block)
+        return block
+
+    def _cache(self, entry: int, end: int, code: Union[Decoded, Callable]):
+        # remember which cells this code was derived from
+        self._code[entry] = code
+        self._extent[entry] = end
+        for addr in range(entry, end):
+            self._owners.setdefault(addr, set()).add(entry)
+
+    def _invalidate(self, addr: int):
+        # drop all cached code that covers this memory cell, because it was overwritten
+        for entry in self._owners.pop(addr, ()):
+            del self._code[entry]
+            for cell in range(entry, self._extent.pop(entry)):
+                owners = self._owners.get(cell)
+                if owners is not None:
+                    owners.discard(entry)
+                    if not owners:
+                        del self._owners[cell]
+
+    def _pristine(self, start: int, end: int) -> bool:
+        # do all these cells still hold the program image, because their pages were never written?
+        image_pages = self.memory.image_pages
+        return all(page < len(image_pages) and self._pages[page] is image_pages[page]
+                   for page in range(start >> PAGE_BITS, ((end - 1) >> PAGE_BITS) + 1))
+
+    def _patched(self, addr: int):
+        # an external write, which modifies the program, so that cached warm states do not apply anymore
+        self._fresh = False
+        self._invalidate(addr)
+
+    def _invalidate_page(self, page: int):
+        # drop all cached code that covers some cell of this page
+        for addr in range(page << PAGE_BITS, (page + 1) << PAGE_BITS):
+            if addr in self._owners:
+                self._invalidate(addr)
+
+    def _write(self, addr: int, value: int) -> bool:
+        # write through the memory on page faults and tell whether it had to be replaced by list memory
+        try:
+            self.memory.write(addr, value)
+            return False
+        except OverflowError:
+            self._widen()
+            self.memory.write(addr, value)
+            return True
+
+    def _widen(self):
+        # int64 arithmetic never wraps, because all values are Python integers, but int64 pages cannot hold
+        # every result, so only this machine continues with list memory, which shares the pages of the image
+        memory = self.image.create_memory("list")
+        memory.adopt(self.memory)
+        memory.on_write = self._patched
+        self.memory, self._pages = memory, memory.pages
+
+        if self._warm_states is not None:
+            self._warm_states = _warm_states(ListMemory, self.digest, self.text is not None)
+
+        # compiled blocks are bound to the old page table, but decoded instructions are still valid
+        if self.engine == "compiler":
+            self._code.clear()
+            self._extent.clear()
+            self._owners.clear()
+
+    def _load(self, mode: int, param: int) -> int:
+        if mode == _IMMEDIATE:
+            return param
+        addr = param if mode == _POSITION else self.base + param
+        if addr < 0:
+            raise IndexError(f"negative memory address {addr}")  # which would wrap around to the last pages
+        try:
+            return int(self._pages[addr >> PAGE_BITS][addr & PAGE_MASK])
+        except IndexError:
+            return self.memory.read(addr)  # beyond the dense page table
+
+    def _store(self, mode: int, param: int, value: int) -> bool:
+        addr = param if mode == _POSITION else self.base + param
+        if addr < 0:
+            raise IndexError(f"negative memory address {addr}")  # which would wrap around to the last pages
+        try:
+            self._pages[addr >> PAGE_BITS][addr & PAGE_MASK] = value
+        except (IndexError, ValueError, TypeError, OverflowError):
+            self._write(addr, value)  # page fault on a missing or shared page, or a value beyond int64
+        if addr in self._owners:
+            self._invalidate(addr)
+            return True  # cached code was overwritten
+
+        return False
+
+    def _add(self, ip: int, instr: Decoded) -> int:
+        _, _, ma, a, mb, b, mc, c = instr
+        self._store(mc, c, self._load(ma, a) + self._load(mb, b))
+        return ip + 4
+
+    def _mul(self, ip: int, instr: Decoded) -> int:
+        _, _, ma, a, mb, b, mc, c = instr
+        self._store(mc, c, self._load(ma, a) * self._load(mb, b))
+        return ip + 4
+
+    def _input(self, ip: int, instr: Decoded) -> int:
+        value = self._receive()
+        if value is None:
+            self.steps -= 1  # the instruction will be executed again, so it should not be counted now
+            return -1  # pause until more input is available
+
+        self._store(instr[2], instr[3], value)
+        return ip + 2
+
+    def _output(self, ip: int, instr: Decoded) -> int:
+        if self._send(self._load(instr[2], instr[3])):
+            self.ip = ip + 2
+            return -1  # pause, so that the value can be streamed
+
+        return ip + 2
+
+    def _jmp_true(self, ip: int, instr: Decoded) -> int:
+        _, _, ma, a, mb, b, _, _ = instr
+        return self._jump(mb, b) if self._load(ma, a) != 0 else ip + 3
+
+    def _jmp_false(self, ip: int, instr: Decoded) -> int:
+        _, _, ma, a, mb, b, _, _ = instr
+        return self._jump(mb, b) if self._load(ma, a) == 0 else ip + 3
+
+    def _jump(self, mode: int, param: int) -> int:
+        # negative values stop the dispatch loop, so they must never be returned as the next instruction pointer
+        target = self._load(mode, param)
+        if target < 0:
+            raise IndexError(f"negative instruction pointer {target}")
+        return target
+
+    def _less_than(self, ip: int, instr: Decoded) -> int:
+        _, _, ma, a, mb, b, mc, c = instr
+        self._store(mc, c, int(self._load(ma, a) < self._load(mb, b)))
+        return ip + 4
+
+    def _equals(self, ip: int, instr: Decoded) -> int:
+        _, _, ma, a, mb, b, mc, c = instr
+        self._store(mc, c, int(self._load(ma, a) == self._load(mb, b)))
+        return ip + 4
+
+    def _base_offset(self, ip: int, instr: Decoded) -> int:
+        self.base += self._load(instr[2], instr[3])
+        return ip + 2
+
+    def _halt(self, ip: int, instr: Decoded) -> int:
+        self.done = True
+        return -1
+
+    def _compare_jump(self, ip: int, instr: Decoded) -> int:
+        _, length, ma, a, mb, b, mc, c, equals, jump_if, mt, t = instr
+        x, y = self._load(ma, a), self._load(mb, b)
+        flag = x == y if equals else x < y
+
+        # the comparison result is still stored, because it might be read elsewhere
+        if self._store(mc, c, int(flag)):
+            return ip + 4  # the jump itself might have been overwritten
+
+        self.steps += 1
+        return self._jump(mt, t) if flag == jump_if else ip + length
+
+    def _offset_then(self, ip: int, instr: Decoded) -> int:
+        _, _, ma, a, second = instr
+        self.base += self._load(ma, a)
+        self.steps += 1
+        return second[0](self, ip + 2, second)
+
+    def __getstate__(self) -> dict:
+        # callbacks and compiled code are bound to this process, so machines are pickled as checkpoints,
+        # along with their image and the options to rebuild them
+        options = {"backend": "list" if self.memory.native else "numpy", "engine": self.engine,
+                   "optimize": self.optimize, "warm": self.warm, "cache": self.cache, "ascii": self.text is not None}
+        return {"image": self.image, "options": options, "checkpoint": self.checkpoint()}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["image"], **state["options"])
+        self.load_checkpoint(state["checkpoint"])
+
+    def _induction_loop(self, ip: int, instr: Decoded) -> int:
+        # fast-forward a counting loop to its exit, if its counters provably change by constant strides,
+        # otherwise just execute its first instruction
+        _, length, adds, compare, jump_if, mj, j, count, first = instr
+        base, end = self.base, ip + length
+        if self._budgeted:
+            return first[0](self, ip, first)
+
+        # resolve the written cells, which must neither overlap each other nor the loop itself
+        counters, flag = {}, None
+        for pos, mc, c, mk, k in adds:
+            addr = c if mc == _POSITION else base + c
+            if addr < 0 or addr in counters or ip <= addr < end:
+                return first[0](self, ip, first)
+            counters[addr] = pos, mk, k
+        if compare is not None:
+            flag = compare[7] if compare[6] == _POSITION else base + compare[7]
+            if flag < 0 or flag in counters or ip <= flag < end:
+                return first[0](self, ip, first)
+
+        # strides need to be immediate or read from cells that are not written within the loop
+        strides = {}
+        for addr, (pos, mk, k) in counters.items():
+            cell = k if mk == _POSITION else base + k
+            if mk != _IMMEDIATE and (cell in counters or cell == flag):
+                return first[0](self, ip, first)
+            strides[addr] = self._load(mk, k)
+
+        def affine(mode: int, param: int, at: int) -> Optional[Tuple[int, int]]:
+            # value of an operand in the first iteration, when it is read by the instruction at position at,
+            # and its stride per iteration
+            if mode == _IMMEDIATE:
+                return param, 0
+            cell = param if mode == _POSITION else base + param
+            if cell == flag or cell < 0:
+                return None
+            if cell in counters:
+                return self._load(_POSITION, cell) + (strides[cell] if counters[cell][0] < at else 0), strides[cell]
+            return self._load(_POSITION, cell), 0
+
+        if compare is not None:
+            pos, equals, ma, a, mb, b, _, _ = compare
+            x, y, proceed = affine(ma, a, pos), affine(mb, b, pos), jump_if
+        else:
+            # jumping on a counter itself continues as long as it is not zero, or as long as it is zero
+            x, y, equals, proceed = affine(mj, j, count - 1), (0, 0), True, not jump_if
+        if x is None or y is None:
+            return first[0](self, ip, first)
+
+        d0, stride = x[0] - y[0], x[1] - y[1]
+        last = _first_exit(d0, stride, equals, proceed)
+        if last is None or last + 1 < LOOP_MIN_TRIPS:
+            return first[0](self, ip, first)  # an endless loop, or one which is not worth it
+
+        # apply the state after the last iteration in one shot
+        trips = last + 1
+        for addr in counters:
+            self._store(_POSITION, addr, self._load(_POSITION, addr) + strides[addr] * trips)
+        if flag is not None:
+            d = d0 + stride * last
+            self._store(_POSITION, flag, int(d == 0 if equals else d < 0))
+
+        self.steps += trips * count - 1
+        self.skipped += trips * count
+        return end
+
     @staticmethod
     def parse_memory(text: str) -> np.ndarray:
         """
         Parse a program from its string representation
         @param text: A comma-separated list of memory values
-        @return: A memory array
+        @return: A memory array of int64 values, or of Python integers if some value is beyond the int64 range
+        """
+        values = list(map(int, text.split(",")))
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            return np.array(values, dtype=object)
+
+
+class MachinePool(object):
+
+    def __init__(self, memory: Union[np.ndarray, str], **options):
+        """
+        Keep idle machines of the same program around, so that drivers which run the program over and over again
+        neither construct new machines nor decode the program again. New machines are forks of a template machine
+        and share the pages of the program image with it.
+        @param memory: Program and data memory
+        @param options: Further keyword arguments for the IntcodeMachine constructor
+        """
+        self.template = IntcodeMachine(memory, **options)
+        self.idle = []  # type: List[IntcodeMachine]
+
+    def acquire(self, inputs: Sequence[int] = None) -> IntcodeMachine:
+        """
+        Take an idle machine out of the pool, or fork a new one if all machines are busy
+        @param inputs: Fill the input buffer with these values
+        @return: A machine in its original state
+        """
+        vm = self.idle.pop() if self.idle else self.template.fork()
+        if inputs is not None:
+            vm.inputs.extend(inputs)
+
+        return vm
+
+    def release(self, vm: IntcodeMachine):
+        """
+        Reset a machine and put it back into the pool
+        @param vm: A machine that was acquired from this pool
+        """
+        vm.reset()
+        vm.on_input = None
+        vm.on_output = None
+        self.idle.append(vm)
+
+    @contextmanager
+    def machine(self, inputs: Sequence[int] = None) -> Iterator[IntcodeMachine]:
+        """
+        Acquire a machine for the duration of a with-block and release it afterwards
+        @param inputs: Fill the input buffer with these values
         """
-        return np.array(list(map(int, text.split(","))), dtype=np.int64)
+        vm = self.acquire(inputs)
+        try:
+            yield vm
+        finally:
+            self.release(vm)
+
+
+# available execution engines
+ENGINES = ("interpreter", "compiler")
+
+# handlers of superinstructions
+_FUSED = {IntcodeMachine._compare_jump, IntcodeMachine._offset_then}
+
+# flat dispatch table from opcodes to their handlers
+_HANDLERS = {
+    Opcode.ADD: IntcodeMachine._add,
+    Opcode.MUL: IntcodeMachine._mul,
+    Opcode.INPUT: IntcodeMachine._input,
+    Opcode.OUTPUT: IntcodeMachine._output,
+    Opcode.JMP_TRUE: IntcodeMachine._jmp_true,
+    Opcode.JMP_FALSE: IntcodeMachine._jmp_false,
+    Opcode.LESS_THAN: IntcodeMachine._less_than,
+    Opcode.EQUALS: IntcodeMachine._equals,
+    Opcode.BASE_OFFSET: IntcodeMachine._base_offset,
+    Opcode.HALT: IntcodeMachine._halt
+}
@@ -0,0 +1,263 @@
+# Advent of Code 2019, Batched Intcode Machine
+# (c) blu3r4y
+
+from typing import Dict, List, Union, Sequence
+
+import numpy as np
+
+from intcode import Mode, Opcode, ProgramImage
+
+# smallest int64 value, whose negation does not fit into int64 either
+INT64_MIN = np.iinfo(np.int64).min
+
+
+class IntcodeBatch(object):
+
+    def __init__(self, memory: Union[np.ndarray, str, ProgramImage], n: int, inputs: Sequence[Sequence[int]] = None):
+        """
+        Create a batch of IntCode virtual machines, which all start with the same program and data memory
+        and execute in lockstep. The memory of instance i is stored in row i of a 2-d int64 array,
+        results beyond the int64 range fail with an OverflowError instead of silently wrapping around.
+        An instance that fails stops, along with its error, while all other instances keep running.
+        @param memory: Program and data memory, or a shared program image
+        @param n: Number of instances
+        @param inputs: Optional input buffers, one sequence per instance
+        """
+
+        image = ProgramImage.load(memory).cells.astype(np.int64)  # raises an OverflowError for huge values
+
+        self.n = n
+        self.image = image  # program image, which all instances started with
+        self.memory = np.tile(np.pad(image, (0, len(image)), "constant"), (n, 1))  # program and data
+        self.ip = np.zeros(n, dtype=np.int64)  # instruction pointers
+        self.base = np.zeros(n, dtype=np.int64)  # relative bases
+        self.done = np.zeros(n, dtype=bool)  # which instances are finished?
+        self.waiting = np.zeros(n, dtype=bool)  # which instances wait for more input?
+        self.steps = np.zeros(n, dtype=np.int64)  # number of executed instructions
+        self.failed = np.zeros(n, dtype=bool)  # which instances stopped because of an error?
+        self.errors = {}  # type: Dict[int, Exception]  # errors of the failed instances by their index
+
+        # input buffers with a read cursor and output buffers with a write cursor, one row per instance
+        self.inputs = np.zeros((n, 0), dtype=np.int64)
+        self.ninputs = np.zeros(n, dtype=np.int64)
+        self.consumed = np.zeros(n, dtype=np.int64)
+        self.outputs = np.zeros((n, 0), dtype=np.int64)
+        self.noutputs = np.zeros(n, dtype=np.int64)
+
+        if inputs is not None:
+            self.feed(inputs)
+
+        # dispatch table from opcodes to vectorized handlers
+        self._handlers = {
+            Opcode.ADD: self._add,
+            Opcode.MUL: self._mul,
+            Opcode.INPUT: self._input,
+            Opcode.OUTPUT: self._output,
+            Opcode.JMP_TRUE: self._jmp_true,
+            Opcode.JMP_FALSE: self._jmp_false,
+            Opcode.LESS_THAN: self._less_than,
+            Opcode.EQUALS: self._equals,
+            Opcode.BASE_OFFSET: self._base_offset,
+            Opcode.HALT: self._halt
+        }
+
+    @property
+    def running(self) -> np.ndarray:
+        """
+        @return: A mask of all instances that can make progress
+        """
+        return ~self.done & ~self.waiting & ~self.failed
+
+    def feed(self, inputs: Sequence[Sequence[int]]):
+        """
+        Append values to the input buffers and wake up all instances that received at least one value
+        @param inputs: One sequence of values per instance, sequences can have different lengths
+        """
+        lengths = np.array([len(values) for values in inputs], dtype=np.int64)
+        if len(lengths) != self.n:
+            raise ValueError(f"expected {self.n} input sequences but got {len(lengths)}")
+
+        self._reserve("inputs", int((self.ninputs + lengths).max(initial=0)))
+        for i, values in enumerate(inputs):
+            self.inputs[i, self.ninputs[i]:self.ninputs[i] + lengths[i]] = values
+
+        self.ninputs += lengths
+        self.waiting &= lengths == 0
+
+    def get_output(self, i: int) -> List[int]:
+        """
+        @param i: Instance index
+        @return: All output values of that instance
+        """
+        return self.outputs[i, :self.noutputs[i]].tolist()
+
+    def diff(self, i: int) -> Dict[int, int]:
+        """
+        @param i: Instance index
+        @return: The values of all cells of that instance that differ from the program image by their address
+        """
+        row = self.memory[i]
+        image = np.pad(self.image, (0, len(row) - len(self.image)), "constant")
+        return {int(addr): int(row[addr]) for addr in np.flatnonzero(row != image)}
+
+    def run(self, max_steps: int = None) -> int:
+        """
+        Execute all instances in lockstep until every instance halted or waits for input
+        @param max_steps: Optional maximum number of lockstep iterations
+        @return: Number of lockstep iterations
+        """
+        steps = 0
+        while (max_steps is None or steps < max_steps) and self.step():
+            steps += 1
+
+        return steps
+
+    def step(self) -> int:
+        """
+        Execute one instruction on every running instance, grouped by their current opcode
+        @return: Number of instances that executed an instruction
+        """
+        # negative instruction pointers would wrap around to the end of the memory rows
+        for i in np.flatnonzero(self.running & (self.ip < 0)):
+            self._fail(i, IndexError(f"negative instruction pointer {self.ip[i]}"))
+
+        rows = np.flatnonzero(self.running)
+        if len(rows) == 0:
+            return 0
+
+        ip = self.ip[rows]
+        self._reserve("memory", int(ip.max()) + 4)
+        opcodes = self.memory[rows, ip]
+        instrcodes = opcodes % 100
+
+        for instrcode in np.unique(instrcodes):
+            group = instrcodes == instrcode
+            handler = self._handlers.get(int(instrcode))
+            if handler is None:
+                for i in rows[group]:
+                    self._fail(i, ValueError(f"unknown opcode {self.memory[i, self.ip[i]]} at ip = {self.ip[i]}"))
+                continue
+
+            try:
+                handler(rows[group], ip[group], opcodes[group])
+            except (IndexError, ValueError, OverflowError):
+                # handlers check everything before they modify any state, so the instances can be retried one by one
+                for i, p, opcode in zip(rows[group], ip[group], opcodes[group]):
+                    try:
+                        handler(np.array([i]), np.array([p]), np.array([opcode]))
+                    except (IndexError, ValueError, OverflowError) as e:
+                        self._fail(i, e)
+
+        # instances that wait for input or failed did not execute their instruction
+        self.steps[rows] += ~(self.waiting[rows] | self.failed[rows])
+        return len(rows)
+
+    def _fail(self, i: int, error: Exception):
+        # stop an instance, which can not execute its current instruction
+        self.failed[i] = True
+        self.errors[int(i)] = error
+
+    def _reserve(self, name: str, size: int):
+        # grow the columns of a 2-d buffer to hold at least size values per instance
+        arr = getattr(self, name)
+        if size > arr.shape[1]:
+            setattr(self, name, np.pad(arr, ((0, 0), (0, max(size, 2 * arr.shape[1]) - arr.shape[1])), "constant"))
+
+    def _addresses(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray, i: int) -> np.ndarray:
+        # resolve the memory addresses of the i-th parameter, immediate parameters resolve to address 0
+        params = self.memory[rows, ip + 1 + i]
+        modes = opcodes // (10 ** (i + 2)) % 10
+        addrs = np.where(modes == Mode.RELATIVE, self.base[rows] + params, params)
+        addrs[modes == Mode.IMMEDIATE] = 0
+
+        if np.any(addrs < 0):
+            raise IndexError(f"negative memory address {addrs[addrs < 0][0]} in instance {rows[addrs < 0][0]}")
+
+        self._reserve("memory", int(addrs.max(initial=0)) + 1)
+        return addrs
+
+    def _load(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray, i: int) -> np.ndarray:
+        addrs = self._addresses(rows, ip, opcodes, i)
+        values = self.memory[rows, addrs]
+        immediate = opcodes // (10 ** (i + 2)) % 10 == Mode.IMMEDIATE
+        return np.where(immediate, self.memory[rows, ip + 1 + i], values)
+
+    def _store(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray, i: int, values: np.ndarray):
+        # output parameters are always memory addresses because they will be written
+        if np.any(opcodes // (10 ** (i + 2)) % 10 == Mode.IMMEDIATE):
+            raise ValueError(f"unsupported immediate mode for instruction {opcodes[0]} at ip = {ip[0]}")
+
+        addrs = self._addresses(rows, ip, opcodes, i)
+        self.memory[rows, addrs] = values
+
+    def _add(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        a, b = self._load(rows, ip, opcodes, 0), self._load(rows, ip, opcodes, 1)
+        result = a + b
+        self._check_overflow(rows, ip, ((a ^ result) & (b ^ result)) < 0)  # the sign flipped
+        self._store(rows, ip, opcodes, 2, result)
+        self.ip[rows] = ip + 4
+
+    def _mul(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        a, b = self._load(rows, ip, opcodes, 0), self._load(rows, ip, opcodes, 1)
+        # the product wrapped around if dividing it again does not give the other factor
+        with np.errstate(over="ignore"):
+            result = a * b
+            nonzero = np.where(a != 0, a, 1)
+            wrapped = (a != 0) & ((result // nonzero != b) | (result % nonzero != 0))
+        self._check_overflow(rows, ip, wrapped | ((a == -1) & (b == INT64_MIN)) | ((b == -1) & (a == INT64_MIN)))
+        self._store(rows, ip, opcodes, 2, result)
+        self.ip[rows] = ip + 4
+
+    @staticmethod
+    def _check_overflow(rows: np.ndarray, ip: np.ndarray, overflow: np.ndarray):
+        if np.any(overflow):
+            i = np.argmax(overflow)
+            raise OverflowError(f"result beyond the int64 range at ip = {ip[i]} in instance {rows[i]}")
+
+    def _input(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        # pause all instances with an empty input buffer
+        available = self.consumed[rows] < self.ninputs[rows]
+        self.waiting[rows[~available]] = True
+
+        rows, ip, opcodes = rows[available], ip[available], opcodes[available]
+        if len(rows) == 0:
+            return
+
+        self._store(rows, ip, opcodes, 0, self.inputs[rows, self.consumed[rows]])
+        self.consumed[rows] += 1
+        self.ip[rows] = ip + 2
+
+    def _output(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        self._reserve("outputs", int(self.noutputs[rows].max()) + 1)
+        self.outputs[rows, self.noutputs[rows]] = self._load(rows, ip, opcodes, 0)
+        self.noutputs[rows] += 1
+        self.ip[rows] = ip + 2
+
+    def _jump(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray, taken: np.ndarray):
+        # the target is only loaded by instances that take the jump, just like the scalar machine does
+        target = self._load(rows[taken], ip[taken], opcodes[taken], 1)
+        self.ip[rows] = ip + 3
+        self.ip[rows[taken]] = target
+
+    def _jmp_true(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        self._jump(rows, ip, opcodes, self._load(rows, ip, opcodes, 0) != 0)
+
+    def _jmp_false(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        self._jump(rows, ip, opcodes, self._load(rows, ip, opcodes, 0) == 0)
+
+    def _less_than(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        a, b = self._load(rows, ip, opcodes, 0), self._load(rows, ip, opcodes, 1)
+        self._store(rows, ip, opcodes, 2, (a < b).astype(np.int64))
+        self.ip[rows] = ip + 4
+
+    def _equals(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        a, b = self._load(rows, ip, opcodes, 0), self._load(rows, ip, opcodes, 1)
+        self._store(rows, ip, opcodes, 2, (a == b).astype(np.int64))
+        self.ip[rows] = ip + 4
+
+    def _base_offset(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        self.base[rows] += self._load(rows, ip, opcodes, 0)
+        self.ip[rows] = ip + 2
+
+    def _halt(self, rows: np.ndarray, ip: np.ndarray, opcodes: np.ndarray):
+        self.done[rows] = True
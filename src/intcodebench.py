@@ -0,0 +1,631 @@
+# Advent of Code 2019, Intcode Benchmark
+# (c) blu3r4y
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import deque, namedtuple
+from itertools import permutations
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from funcy import chunks
+
+from intcode import IntcodeMachine, ProgramImage
+from intcodebatch import IntcodeBatch
+
+# version of the report format
+REPORT_VERSION = 1
+
+# default directory of the local copies of the puzzle inputs, i.e. inputs/day2.txt and so on
+INPUTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "inputs")
+
+# machine options of every configuration, all of them are compared against the reference,
+# which runs on the standalone ReferenceMachine instead of an IntcodeMachine and takes no options,
+# the batch configuration only runs drivers with probes, all at once on an IntcodeBatch
+CONFIGS = {
+    "reference": {},
+    "interpreter-plain": dict(engine="interpreter", optimize=False, backend="list"),
+    "interpreter": dict(engine="interpreter", backend="list"),
+    "interpreter-numpy": dict(engine="interpreter", backend="numpy"),
+    "interpreter-warm": dict(engine="interpreter", backend="list", warm=0),
+    "compiler": dict(engine="compiler", backend="list"),
+    "compiler-numpy": dict(engine="compiler", backend="numpy"),
+    "batch": dict(engine="batch"),
+}
+
+# the configuration that defines the correct results, and the one of the batch engine
+REFERENCE = "reference"
+BATCH = "batch"
+
+# a program along with its driver, which receives a machine factory and returns the observable result,
+# the factory accepts an optional input buffer and further machine options
+Workload = namedtuple("Workload", ["name", "image", "driver"])
+
+# timing, peak memory and differences to the reference of one workload in one configuration
+# the rate is based on the instructions of the reference, because some configurations skip instructions
+Measurement = namedtuple("Measurement", ["workload", "config", "seconds", "instructions", "executed", "rate", "peak",
+                                         "correct", "mismatches", "error"])
+
+# fields of the final machine states that are compared against the reference
+FIELDS = ("ip", "base", "done", "steps", "memory")
+
+Factory = Callable[..., IntcodeMachine]
+
+# drivers that only consist of independent runs of fresh machines carry the input values of all runs as their probes,
+# along with a function that derives the result of the driver from the output values of all runs
+Probes = namedtuple("Probes", ["inputs", "collect"])
+
+
+class ReferenceMemory(object):
+
+    def __init__(self, program: List[int]):
+        """
+        Memory of the reference machine, which only keeps the cells that were written
+        @param program: Values of the program image
+        """
+        self.program = program
+        self.cells = {}  # type: Dict[int, int]
+
+    def diff(self) -> Dict[int, int]:
+        """
+        @return: The values of all cells that differ from the program image by their address
+        """
+        return {addr: value for addr, value in sorted(self.cells.items())
+                if value != (self.program[addr] if addr < len(self.program) else 0)}
+
+    def __getitem__(self, addr: int) -> int:
+        if addr < 0:
+            raise IndexError(f"negative memory address {addr}")
+        if addr in self.cells:
+            return self.cells[addr]
+        return self.program[addr] if addr < len(self.program) else 0
+
+    def __setitem__(self, addr: int, value: int):
+        if addr < 0:
+            raise IndexError(f"negative memory address {addr}")
+        self.cells[addr] = value
+
+
+class ReferenceMachine(object):
+
+    def __init__(self, image: ProgramImage, inputs: List[int] = None, ascii: bool = False):
+        """
+        A minimal Intcode interpreter that shares no decoding, memory or handler code with the engines of the
+        IntcodeMachine, so that bugs of those engines can not hide in the reference results. It executes one
+        instruction at a time and only offers the part of the machine interface that the drivers use.
+        @param image: Program and data memory
+        @param inputs: Input buffer for input instructions
+        @param ascii: Collect output values from 0 to 255 in the text buffer instead of the output buffer
+        """
+        self.program = [int(value) for value in image.cells]
+        self.memory = ReferenceMemory(self.program)
+        self.ip = 0
+        self.base = 0
+        self.done = False
+        self.steps = 0
+        self.inputs = deque(inputs if inputs is not None else [])
+        self.outputs = deque()
+        self.text = bytearray() if ascii else None
+        self.on_input = None
+
+    def reset(self):
+        """
+        Revert the memory and clear all buffers, but keep counting instructions
+        """
+        self.memory = ReferenceMemory(self.program)
+        self.ip, self.base, self.done = 0, 0, False
+        self.inputs.clear()
+        self.outputs.clear()
+        if self.text is not None:
+            self.text.clear()
+
+    def execute(self, inputs: Sequence[int] = None, nopause=False, pop=False) -> Optional[int]:
+        """
+        Execute the program until it halted or the input buffer is empty
+        @param inputs: Fill the input buffer with these values
+        @param nopause: Raise an error if the input buffer was empty
+        @param pop: Also pop the last output value from the buffer
+        @return: The last output value
+        """
+        if inputs is not None:
+            self.inputs.extend(inputs)
+        while self._step():
+            pass
+
+        if nopause and not self.done:
+            raise RuntimeError(f"vm execution stopped at ip = {self.ip} because the input buffer was empty")
+        if not self.outputs:
+            return None
+        return self.outputs.pop() if pop else self.outputs[-1]
+
+    def stream(self) -> Iterator[int]:
+        """
+        Execute the program and yield every output value as soon as it was written
+        """
+        while self._step():
+            while self.outputs:
+                yield self.outputs.popleft()
+
+    def read_text(self) -> str:
+        """
+        @return: All text that was written so far, which is removed from the text buffer
+        """
+        text = self.text.decode("latin-1")
+        self.text.clear()
+        return text
+
+    def _step(self) -> bool:
+        # execute a single instruction and tell whether the machine can go on
+        if self.done:
+            return False
+
+        memory, ip = self.memory, self.ip
+        opcode = memory[ip]
+        op, modes = opcode % 100, [opcode // 100 % 10, opcode // 1000 % 10, opcode // 10000 % 10]
+
+        def address(i: int) -> int:
+            if modes[i] == 0:
+                return memory[ip + 1 + i]
+            if modes[i] == 2:
+                return self.base + memory[ip + 1 + i]
+            raise ValueError(f"invalid parameter mode in instruction {opcode} at ip = {ip}")
+
+        def arg(i: int) -> int:
+            return memory[ip + 1 + i] if modes[i] == 1 else memory[address(i)]
+
+        if op == 1:
+            memory[address(2)] = arg(0) + arg(1)
+            self.ip += 4
+        elif op == 2:
+            memory[address(2)] = arg(0) * arg(1)
+            self.ip += 4
+        elif op == 3:
+            value = self.inputs.popleft() if self.inputs else self.on_input() if self.on_input else None
+            if value is None:
+                return False  # pause until more input is available
+            memory[address(0)] = value
+            self.ip += 2
+        elif op == 4:
+            value = arg(0)
+            if self.text is not None and 0 <= value < 256:
+                self.text.append(value)
+            else:
+                self.outputs.append(value)
+            self.ip += 2
+        elif op in (5, 6):
+            self.ip = arg(1) if (arg(0) != 0) == (op == 5) else ip + 3
+        elif op == 7:
+            memory[address(2)] = int(arg(0) < arg(1))
+            self.ip += 4
+        elif op == 8:
+            memory[address(2)] = int(arg(0) == arg(1))
+            self.ip += 4
+        elif op == 9:
+            self.base += arg(0)
+            self.ip += 2
+        elif op == 99:
+            self.done = True
+        else:
+            raise ValueError(f"unknown opcode {opcode} at ip = {ip}")
+
+        self.steps += 1
+        return not self.done
+
+
+def _batch(*inputs: Sequence[int], lockstep: bool = False) -> Callable[[Factory], List[List[int]]]:
+    # run a fresh machine until it halts for each input sequence and collect all outputs,
+    # many short runs are also worth running in lockstep
+    def driver(make: Factory) -> List[List[int]]:
+        results = []
+        for values in inputs:
+            vm = make(list(values))
+            vm.execute(nopause=True)
+            results.append(list(vm.outputs))
+        return results
+
+    if lockstep:
+        driver.probes = Probes([list(values) for values in inputs], list)
+    return driver
+
+
+def _day2(make: Factory) -> int:
+    vm = make()
+    vm.memory[1], vm.memory[2] = 12, 2
+    vm.execute(nopause=True)
+    return vm.memory[0]
+
+
+def _day7(make: Factory) -> Tuple[int, int]:
+    series = []
+    for seq in permutations(range(5)):
+        signal = 0
+        for phase in seq:
+            signal = make([phase, signal]).execute(nopause=True)
+        series.append(signal)
+
+    loops = []
+    for seq in permutations(range(5, 10)):
+        amps, signal = [make([phase]) for phase in seq], 0
+        while not amps[-1].done:
+            for amp in amps:
+                signal = amp.execute([signal], pop=True)
+        loops.append(signal)
+
+    return max(series), max(loops)
+
+
+def _day11(make: Factory) -> List[Dict[Tuple[int, int], int]]:
+    results = []
+    for start in (0, 1):
+        robot, pos, face, panels = make(), 0, 1j, {0: start}
+        robot.on_input = lambda: panels.get(pos, 0)
+        for paint, turn in chunks(2, robot.stream()):
+            panels[pos] = paint
+            face *= 1j if turn == 0 else -1j
+            pos += face
+        results.append({(int(p.real), int(p.imag)): color for p, color in panels.items()})
+
+    return results
+
+
+def _day13(make: Factory) -> Tuple[int, int]:
+    screen = make()
+    screen.execute(nopause=True)
+    blocks = list(screen.outputs)[2::3].count(2)
+
+    # follow the ball with the paddle until the game is over
+    game, score, columns = make(), 0, {}
+    game.memory[0] = 2
+    game.on_input = lambda: (columns[4] > columns[3]) - (columns[4] < columns[3])
+    for x, y, tile in chunks(3, game.stream()):
+        if x == -1 and y == 0:
+            score = tile
+        else:
+            columns[tile] = x
+
+    return blocks, score
+
+
+def _day15(make: Factory) -> Dict[Tuple[int, int], int]:
+    moves = {1: 1j, 2: -1j, 3: -1, 4: 1}
+    back = {1: 2, 2: 1, 3: 4, 4: 3}
+
+    # explore the whole maze depth-first and walk back along the path at dead ends
+    droid, grid, pos, path = make(), {0: 1}, 0, []
+    while True:
+        for cmd, step in moves.items():
+            if pos + step not in grid:
+                grid[pos + step] = status = droid.execute([cmd], pop=True)
+                if status != 0:
+                    pos += step
+                    path.append(cmd)
+                    break
+        else:
+            if not path:
+                break
+            cmd = path.pop()
+            droid.execute([back[cmd]], pop=True)
+            pos -= moves[cmd]
+
+    return {(int(p.real), int(p.imag)): status for p, status in grid.items()}
+
+
+def _day17(make: Factory) -> str:
+    camera = make(ascii=True)
+    camera.execute()
+    return camera.read_text()
+
+
+def _day19(make: Factory, size: int = 50) -> List[int]:
+    # every probe starts a fresh drone, so that the probes are independent and all machines can be compared
+    return [make([x, y]).execute(nopause=True, pop=True) for y in range(size) for x in range(size)]
+
+
+# all probes of the drones can also run in lockstep
+_day19.probes = Probes([[x, y] for y in range(50) for x in range(50)], lambda outputs: [out[-1] for out in outputs])
+
+
+# drivers of the puzzle inputs by their day
+DAYS = {
+    2: _day2,
+    5: _batch([1], [5]),
+    7: _day7,
+    9: _batch([1], [2]),
+    11: _day11,
+    13: _day13,
+    15: _day15,
+    17: _day17,
+    19: _day19,
+}
+
+# synthetic stress programs along with their drivers
+SYNTHETIC = {
+    # sum of i * i for all i < 20000, a loop with a multiplication that can not be fast-forwarded
+    "squares": ("1101,0,0,1000,1101,0,0,1001,2,1000,1000,1002,1,1001,1002,1001,"
+                "1001,1000,1,1000,1007,1000,20000,1003,1005,1003,8,4,1001,99", _batch([])),
+    # a plain counting loop up to 200000, which the optimizer fast-forwards
+    "counter": ("1101,0,0,100,1001,100,1,100,1007,100,200000,101,1005,101,4,4,100,99", _batch([])),
+    # recursive fibonacci numbers, i.e. calls and returns through the relative base
+    "fibonacci": ("109,100,21101,0,11,0,203,1,1105,1,14,204,2,99,"
+                  "21207,1,2,3,1206,3,28,21201,1,0,2,2106,0,0,"
+                  "21101,0,41,4,21201,1,-1,5,109,4,1105,1,14,109,-4,21201,6,0,3,"
+                  "21101,0,60,4,21201,1,-2,5,109,4,1105,1,14,109,-4,22201,3,6,2,2106,0,0", _batch([18])),
+    # a loop that patches an operand of its own body in every iteration
+    "selfmod": ("1101,0,0,100,1101,0,0,101,1,102,101,102,1001,6,1,6,"
+                "1001,100,1,100,1007,100,2000,103,1005,103,4,4,102,99", _batch([])),
+    # powers of three far beyond the int64 range
+    "bigint": ("1101,1,0,100,1101,0,0,101,1002,100,3,100,1001,101,1,101,"
+               "1007,101,2000,102,1005,102,8,4,100,99", _batch([])),
+    # doubles every input value until it reads a zero
+    "echo": ("3,100,1006,100,14,1002,100,2,101,4,101,1105,1,0,99", _batch(list(range(1, 20001)) + [0])),
+    # a faulty program, which writes to a negative address through the relative base and must fail everywhere
+    "negative": ("1101,0,7,300,21101,0,42,-1,4,511,99", _batch([])),
+    # many short probes of a beam, which is hit if x * x < 7 * y, just like the drone of day 19
+    "beam": ("3,100,3,101,2,100,100,102,1002,101,7,103,7,102,103,104,4,104,99",
+             _batch(*[(x, y) for y in range(50) for x in range(50)], lockstep=True)),
+}
+
+
+def corpus(inputs: str = INPUTS, fetch: bool = False) -> Tuple[List[Workload], Dict[str, str]]:
+    """
+    Collect all synthetic programs and the puzzle inputs that are available as local copies
+    @param inputs: Directory of the local copies, named day2.txt, day5.txt and so on
+    @param fetch: Download missing puzzle inputs with aocd and store them as local copies
+    @return: All workloads, and the reasons why the other ones are skipped by their name
+    """
+    workloads, skipped = [], {}
+    for day, driver in DAYS.items():
+        name, path = f"day{day}", os.path.join(inputs, f"day{day}.txt")
+        if not os.path.exists(path) and fetch:
+            from aocd.models import Puzzle
+
+            os.makedirs(inputs, exist_ok=True)
+            with open(path, "w") as f:
+                f.write(Puzzle(year=2019, day=day).input_data)
+
+        if os.path.exists(path):
+            with open(path) as f:
+                workloads.append(Workload(name, ProgramImage.load(f.read().strip()), driver))
+        else:
+            skipped[name] = f"no local copy at {os.path.normpath(path)}"
+
+    for name, (program, driver) in SYNTHETIC.items():
+        workloads.append(Workload(name, ProgramImage.load(program), driver))
+
+    return workloads, skipped
+
+
+def execute(workload: Workload, config: str) -> Tuple[Any, List[IntcodeMachine]]:
+    """
+    Run the driver of a workload once
+    @param workload: The workload
+    @param config: Name of the configuration, see CONFIGS
+    @return: The result of the driver and all machines that it created, in order of their creation,
+             or the batch that ran all probes of the driver
+    """
+    if config == BATCH:
+        probes = workload.driver.probes
+        batch = IntcodeBatch(workload.image, len(probes.inputs), probes.inputs)
+        batch.run()
+        if batch.errors:
+            raise batch.errors[min(batch.errors)]  # just like the first machine that would have failed
+        if not batch.done.all():
+            raise RuntimeError("some instances stopped because their input buffer was empty")
+        return probes.collect([batch.get_output(i) for i in range(batch.n)]), [batch]
+
+    machines = []
+
+    def make(inputs: List[int] = None, **extra) -> IntcodeMachine:
+        if config == REFERENCE:
+            vm = ReferenceMachine(workload.image, inputs, **extra)
+        else:
+            vm = IntcodeMachine(workload.image, inputs, **dict(CONFIGS[config], **extra))
+        machines.append(vm)
+        return vm
+
+    return workload.driver(make), machines
+
+
+def fingerprint(result: Any, machines: List[Union[IntcodeMachine, IntcodeBatch]]) -> Tuple[Any, List[tuple]]:
+    """
+    @param result: The result of a driver
+    @param machines: All machines that the driver created, or a batch of them
+    @return: The result along with the final state of every machine, where memory is the cells that were changed
+    """
+    states = []
+    for vm in machines:
+        if isinstance(vm, IntcodeBatch):
+            states.extend((int(vm.ip[i]), int(vm.base[i]), bool(vm.done[i]), int(vm.steps[i]), vm.diff(i))
+                          for i in range(vm.n))
+        else:
+            states.append((vm.ip, vm.base, vm.done, vm.steps, vm.memory.diff()))
+
+    return result, states
+
+
+def differences(expected: Tuple[Any, List[tuple]], actual: Tuple[Any, List[tuple]], limit: int = 10) -> List[str]:
+    """
+    @param expected: The fingerprint of the reference
+    @param actual: Some other fingerprint
+    @param limit: Maximum number of reported differences
+    @return: Descriptions of the differences, e.g. "machine 3: memory"
+    """
+    if expected[1] is None or actual[1] is None:
+        # at least one run failed, which is only correct if both failed with the same kind of error
+        if expected == actual:
+            return []
+        if expected[1] is None and actual[1] is None:
+            return [f"raised {actual[0]} instead of {expected[0]}"]
+        return [f"raised {actual[0]}" if actual[1] is None else f"did not raise {expected[0]}"]
+
+    mismatches = []
+    if expected[0] != actual[0]:
+        mismatches.append("result")
+    if len(expected[1]) != len(actual[1]):
+        mismatches.append(f"created {len(actual[1])} machines instead of {len(expected[1])}")
+
+    for i, (a, b) in enumerate(zip(expected[1], actual[1])):
+        mismatches.extend(f"machine {i}: {field}" for field, x, y in zip(FIELDS, a, b) if x != y)
+
+    return mismatches[:limit]
+
+
+def measure(workload: Workload, config: str, expected: Tuple[Any, List[tuple]] = None,
+            repeat: int = 3) -> Tuple[Measurement, Tuple[Any, List[tuple]]]:
+    """
+    Benchmark a workload in some configuration. The wall time is the best of several runs, the peak memory
+    is taken from an extra run under tracemalloc, which would slow down the timed runs.
+    @param workload: The workload
+    @param config: Name of the configuration, see CONFIGS
+    @param expected: The fingerprint of the reference, if any
+    @param repeat: Number of timed runs
+    @return: The measurement and the fingerprint of the first run, a failed run has the type of its error
+             as the result and no machines, so that faulty programs are expected to fail in every configuration
+    """
+    seconds, actual = float("inf"), None
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result, machines = execute(workload, config)
+            seconds = min(seconds, time.perf_counter() - start)
+            if actual is None:
+                actual = fingerprint(result, machines)
+
+        tracemalloc.start()
+        try:
+            execute(workload, config)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except Exception as e:
+        actual = type(e).__name__, None
+        mismatches = differences(expected, actual) if expected is not None else []
+        return Measurement(workload.name, config, None, None, None, None, None, not mismatches, mismatches,
+                           f"{type(e).__name__}: {e}"), actual
+
+    executed = sum(state[3] for state in actual[1])
+    mismatches = differences(expected, actual) if expected is not None else []
+    if mismatches or expected is None or expected[1] is None:
+        instructions = executed
+    else:
+        instructions = sum(state[3] for state in expected[1])
+    rate = instructions / seconds if seconds > 0 else None
+    return Measurement(workload.name, config, seconds, instructions, executed, rate, peak, not mismatches,
+                       mismatches, None), actual
+
+
+def benchmark(workloads: Sequence[Workload], configs: Sequence[str] = None, repeat: int = 3,
+              log: Callable[[Measurement], Any] = None) -> List[Measurement]:
+    """
+    Benchmark every workload in every configuration and compare the results against the reference interpreter
+    @param workloads: The workloads
+    @param configs: Names of the configurations (default: all of them), the reference is always included
+    @param repeat: Number of timed runs per workload and configuration
+    @param log: Optional callback, which receives every measurement as soon as it is available
+    @return: All measurements
+    """
+    configs = [REFERENCE] + [c for c in (configs or CONFIGS) if c != REFERENCE]
+    for config in configs:
+        if config not in CONFIGS:
+            raise ValueError(f"unknown configuration {config}")
+
+    measurements = []
+    for workload in workloads:
+        expected = None
+        for config in configs:
+            if config == BATCH and getattr(workload.driver, "probes", None) is None:
+                continue  # the driver depends on interaction or on state that outlives a single run
+
+            measurement, actual = measure(workload, config, expected, repeat)
+            if config == REFERENCE:
+                expected = actual
+            measurements.append(measurement)
+            if log is not None:
+                log(measurement)
+
+    return measurements
+
+
+def report(measurements: List[Measurement], skipped: Dict[str, str] = None) -> dict:
+    """
+    @param measurements: All measurements
+    @param skipped: The reasons why some workloads were skipped by their name
+    @return: A json-serializable report, along with the environment it was taken in
+    """
+    return {
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "configs": {name: CONFIGS[name] for name in sorted({m.config for m in measurements})},
+        "results": [m._asdict() for m in measurements],
+        "skipped": skipped or {},
+        "correct": all(m.correct for m in measurements),
+    }
+
+
+def regressions(baseline: dict, current: dict, tolerance: float = 0.1) -> List[str]:
+    """
+    Compare two reports of the same workloads and configurations
+    @param baseline: An earlier report
+    @param current: A later report
+    @param tolerance: Relative slowdown that is still accepted (default: 10%)
+    @return: Descriptions of all runs that got incorrect, failed, or slower beyond the tolerance
+    """
+    before = {(r["workload"], r["config"]): r for r in baseline["results"]}
+
+    found = []
+    for r in current["results"]:
+        key = (r["workload"], r["config"])
+        name, b = "{} ({})".format(*key), before.get(key)
+        if not r["correct"]:
+            found.append(f"{name} is incorrect: {', '.join(r['mismatches']) or r['error']}")
+        elif b is None or None in (b["seconds"], r["seconds"]):
+            continue  # new, or failed as expected
+        elif r["seconds"] > b["seconds"] * (1 + tolerance):
+            found.append(f"{name} got slower: {b['seconds']:.3f}s -> {r['seconds']:.3f}s")
+
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Intcode engines and check them against each other")
+    parser.add_argument("--inputs", default=INPUTS, help="directory of the local copies of the puzzle inputs")
+    parser.add_argument("--fetch", action="store_true", help="download missing puzzle inputs with aocd")
+    parser.add_argument("--workloads", nargs="*", help="names of the workloads to run (default: all)")
+    parser.add_argument("--configs", nargs="*", choices=list(CONFIGS), help="configurations to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs (default: 3)")
+    parser.add_argument("--baseline", help="earlier report to check for regressions")
+    parser.add_argument("--output", default="bench.json", help="path of the json report (default: bench.json)")
+    args = parser.parse_args()
+
+    selected, missing = corpus(args.inputs, args.fetch)
+    if args.workloads:
+        selected = [w for w in selected if w.name in args.workloads]
+
+    def show(m: Measurement):
+        if m.error is not None:
+            print(f"{m.workload:>10} {m.config:>18}  failed: {m.error}  {'ok' if m.correct else 'MISMATCH'}")
+        else:
+            print(f"{m.workload:>10} {m.config:>18} {m.seconds:9.3f}s {m.rate or 0:14,.0f} instr/s "
+                  f"{m.peak / 2 ** 20:8.1f} MiB  {'ok' if m.correct else 'MISMATCH ' + ', '.join(m.mismatches)}")
+
+    data = report(benchmark(selected, args.configs, args.repeat, show), missing)
+    with open(args.output, "w") as f:
+        json.dump(data, f, indent=2)
+
+    for name, reason in missing.items():
+        print(f"skipped {name}: {reason}")
+
+    problems = []
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            problems = regressions(json.load(f), data)
+        for problem in problems:
+            print(problem)
+
+    sys.exit(0 if data["correct"] and not problems else 1)
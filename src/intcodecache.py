@@ -0,0 +1,110 @@
+# Advent of Code 2019, Intcode Run Cache
+# (c) blu3r4y
+
+import json
+import sqlite3
+from collections import namedtuple, OrderedDict
+from typing import Optional, Sequence, Tuple
+
+# hit and miss statistics of a run cache
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# the result of a run that halted, which consists of all output values, the number of consumed input values,
+# and the final state of the machine, whose memory is stored as the sorted (address, value) pairs of all cells
+# that differ from the program image
+RunResult = namedtuple("RunResult", ["outputs", "consumed", "ip", "base", "steps", "memory"])
+
+
+class RunCache(object):
+
+    def __init__(self, maxsize: int = 1 << 16, path: str = None):
+        """
+        Cache the results of non-interactive runs, which only depend on the program image and the input values.
+        The most recently used results are kept in memory, and all results can be persisted in a database file,
+        which is shared by all processes and sessions that use the same path.
+        @param maxsize: Maximum number of results that are kept in memory
+        @param path: Optional path of an sqlite database file for the persistent tier
+        """
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._db = None  # connected on first use
+
+    def get(self, digest: str, inputs: Sequence[int]) -> Optional[RunResult]:
+        """
+        Look up the result of an earlier run, first in memory and then in the database
+        @param digest: Hash of the program image
+        @param inputs: All input values of the run
+        @return: The outputs, the number of consumed inputs and the final state, or None if the run is unknown
+        """
+        key = (digest, tuple(inputs))
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+        elif self.path is not None:
+            row = self._connect().execute("SELECT result FROM runs WHERE key = ?", (self._dbkey(key),)).fetchone()
+            fields = json.loads(row[0]) if row is not None else None
+            if fields is not None and len(fields) == len(RunResult._fields):  # older rows lack the final state
+                outputs, consumed, ip, base, steps, memory = fields
+                result = RunResult(tuple(outputs), consumed, ip, base, steps, tuple(map(tuple, memory)))
+                self._remember(key, result)
+
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return result
+
+    def put(self, digest: str, inputs: Sequence[int], result: Sequence):
+        """
+        Store the result of a run that halted
+        @param digest: Hash of the program image
+        @param inputs: All input values of the run
+        @param result: The fields of the result, see RunResult
+        """
+        key, result = (digest, tuple(inputs)), RunResult._make(result)
+        self._remember(key, result)
+
+        if self.path is not None:
+            self._connect().execute("INSERT OR REPLACE INTO runs VALUES (?, ?)", (self._dbkey(key), json.dumps(result)))
+
+    def info(self) -> CacheInfo:
+        """
+        @return: The hit and miss statistics, along with the current number of results in memory
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._results))
+
+    def clear(self):
+        """
+        Drop all results from memory and reset the statistics, the database is not modified
+        """
+        self._results.clear()
+        self.hits = self.misses = 0
+
+    def _remember(self, key: Tuple[str, Tuple[int, ...]], result: RunResult):
+        # evict the least recently used results
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, isolation_level=None)  # commit every statement immediately
+            self._db.execute("PRAGMA synchronous = OFF")
+            self._db.execute("CREATE TABLE IF NOT EXISTS runs (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        return self._db
+
+    @staticmethod
+    def _dbkey(key: Tuple[str, Tuple[int, ...]]) -> str:
+        digest, inputs = key
+        return f"{digest}:{','.join(map(str, inputs))}"
+
+    def __getstate__(self) -> dict:
+        # connections can not be shared with other processes, which connect on their own
+        state = self.__dict__.copy()
+        state["_db"] = None
+        return state
@@ -0,0 +1,228 @@
+# Advent of Code 2019, Intcode Disassembler
+# (c) blu3r4y
+
+from collections import namedtuple
+from typing import Dict, List, Sequence, Set, Union
+
+import numpy as np
+
+from intcode import Mode, Opcode, SIGNATURES, LENGTHS, ProgramImage, create_memory, decode_instruction
+
+# a decoded instruction along with its address, unused modes and parameters are cut off
+Instruction = namedtuple("Instruction", ["addr", "op", "modes", "params"])
+
+# a basic block covers the instructions from start up to end (exclusive) and transfers control to its successors,
+# successors of indirect jumps are unknown
+Block = namedtuple("Block", ["start", "end", "instructions", "successors"])
+
+# a call jumps from site to target, after a return address was stored, which points to the instruction after site
+Call = namedtuple("Call", ["site", "target", "ret"])
+
+# instructions that transfer control
+JUMPS = {Opcode.JMP_TRUE, Opcode.JMP_FALSE}
+
+
+def format_parameter(mode: int, param: int) -> str:
+    """
+    @param mode: A parameter mode
+    @param param: A raw parameter
+    @return: The parameter in assembly notation, where [x] is a memory cell and [rb+x] is relative to the base
+    """
+    if mode == Mode.IMMEDIATE:
+        return str(param)
+    if mode == Mode.RELATIVE:
+        return f"[rb{param:+d}]"
+    return f"[{param}]"
+
+
+def format_instruction(instr: Instruction) -> str:
+    """
+    @param instr: A decoded instruction
+    @return: The instruction in assembly notation, e.g. ADD [100], 1 -> [100]
+    """
+    nin, nout = SIGNATURES[instr.op]
+    args = [format_parameter(m, p) for m, p in zip(instr.modes, instr.params)]
+    text = instr.op.name
+    if nin > 0:
+        text += " " + ", ".join(args[:nin])
+    if nout > 0:
+        text += " -> " + args[nin]
+    return text
+
+
+class IntcodeAnalysis(object):
+
+    def __init__(self, memory: Union[np.ndarray, str, ProgramImage], entries: Sequence[int] = (0,)):
+        """
+        Statically analyze a program image. Code is found by recursive descent from the entry points,
+        which follows all direct jumps and the return addresses of calls. Everything else is data.
+        @param memory: Program and data memory, or a shared program image
+        @param entries: Addresses where execution may start (default: 0)
+        """
+
+        image = ProgramImage.load(memory).cells
+        self.size = len(image)
+        self.memory = create_memory(image, "list")  # cells beyond the image read as zero
+
+        self.entries = list(entries)
+        self.instructions = {}  # type: Dict[int, Instruction]
+        self.invalid = set()  # type: Set[int]  # reachable addresses that do not hold a valid instruction
+        self.calls = []  # type: List[Call]
+        self.returns = set()  # type: Set[int]  # jumps to an address on the stack
+        self.indirect = set()  # type: Set[int]  # jumps to an address in some memory cell
+        self.frames = {}  # type: Dict[int, int]  # relative base adjustments by constant values
+        self.writes = {}  # type: Dict[int, Set[int]]  # instructions that write to some constant address
+        self.stack_writes = set()  # type: Set[int]  # instructions that write relative to the base
+
+        self._descend()
+        self.code = {addr for instr in self.instructions.values()
+                     for addr in range(instr.addr, instr.addr + LENGTHS[instr.op])}
+        self.blocks = self._split()
+
+    @property
+    def data(self) -> Set[int]:
+        """
+        @return: All addresses of the image that are not part of reachable instructions
+        """
+        return set(range(self.size)) - self.code
+
+    @property
+    def functions(self) -> Set[int]:
+        """
+        @return: The entry points of all called functions
+        """
+        return {call.target for call in self.calls}
+
+    @property
+    def written(self) -> Set[int]:
+        """
+        @return: All constant addresses that are written by some instruction
+        """
+        return set(self.writes)
+
+    @property
+    def self_modifying(self) -> bool:
+        """
+        @return: True if some instruction writes to a constant address that holds code,
+                 writes relative to the base are not considered because they are assumed to target the stack
+        """
+        return not self.code.isdisjoint(self.writes)
+
+    def listing(self) -> str:
+        """
+        @return: The disassembly of all code, along with block labels and annotations for calls and returns
+        """
+        calls = {call.site: call for call in self.calls}
+        leaders = {block.start for block in self.blocks}
+
+        lines = []
+        for addr in sorted(self.instructions):
+            instr = self.instructions[addr]
+            if addr in leaders:
+                lines.append(f"{'func' if addr in self.functions else 'block'}_{addr}:")
+
+            line = f"{addr:>6}: {format_instruction(instr)}"
+            if addr in calls:
+                line += f"  ; call func_{calls[addr].target}, return to {calls[addr].ret}"
+            elif addr in self.returns:
+                line += "  ; return"
+            elif addr in self.writes and not self.code.isdisjoint(self.writes[addr]):
+                line += "  ; self-modifying"
+            lines.append(line)
+
+        return "\n".join(lines)
+
+    def _descend(self):
+        worklist = list(self.entries)
+        while worklist:
+            ip = worklist.pop()
+
+            # constants that were stored in the current straight-line run, which might be return addresses
+            constants = set()
+
+            while ip not in self.instructions and ip not in self.invalid and 0 <= ip < self.size:
+                try:
+                    op, modes, params = decode_instruction(self.memory, ip)
+                except ValueError:
+                    self.invalid.add(ip)
+                    break
+
+                n = sum(SIGNATURES[op])
+                instr = Instruction(ip, op, tuple(modes[:n]), tuple(params[:n]))
+                self.instructions[ip] = instr
+                following = ip + LENGTHS[op]
+
+                self._record_write(instr)
+                if op in (Opcode.ADD, Opcode.MUL) and modes[0] == modes[1] == Mode.IMMEDIATE:
+                    a, b = params[0], params[1]
+                    constants.add(a + b if op == Opcode.ADD else a * b)
+                elif op == Opcode.BASE_OFFSET and modes[0] == Mode.IMMEDIATE:
+                    self.frames[ip] = params[0]
+
+                if op in JUMPS:
+                    (ma, mb), (a, b) = instr.modes, instr.params
+                    unconditional = ma == Mode.IMMEDIATE and (a != 0) == (op == Opcode.JMP_TRUE)
+
+                    if mb == Mode.IMMEDIATE:
+                        worklist.append(b)
+                        if unconditional and following in constants:
+                            self.calls.append(Call(ip, b, following))
+                            worklist.append(following)
+                    elif mb == Mode.RELATIVE:
+                        self.returns.add(ip)
+                    else:
+                        self.indirect.add(ip)
+
+                    if unconditional:
+                        break
+                    constants.clear()
+
+                if op == Opcode.HALT:
+                    break
+
+                ip = following
+
+    def _record_write(self, instr: Instruction):
+        nin, nout = SIGNATURES[instr.op]
+        if nout == 0:
+            return
+
+        mode, param = instr.modes[nin], instr.params[nin]
+        if mode == Mode.RELATIVE:
+            self.stack_writes.add(instr.addr)
+        else:
+            self.writes.setdefault(param, set()).add(instr.addr)
+
+    def _split(self) -> List[Block]:
+        # blocks start at entry points, jump targets, return addresses and after conditional jumps
+        leaders = set(self.entries) | {call.ret for call in self.calls}
+        for instr in self.instructions.values():
+            if instr.op in JUMPS:
+                leaders.add(instr.addr + LENGTHS[instr.op])
+                if instr.modes[1] == Mode.IMMEDIATE:
+                    leaders.add(instr.params[1])
+        leaders &= set(self.instructions)
+
+        blocks = []
+        for start in sorted(leaders):
+            ip, body = start, []
+            while ip in self.instructions:
+                instr = self.instructions[ip]
+                body.append(instr)
+                ip += LENGTHS[instr.op]
+                if instr.op in JUMPS or instr.op == Opcode.HALT or ip in leaders:
+                    break
+
+            last, successors = body[-1], []
+            if last.op in JUMPS:
+                (ma, mb), (a, b) = last.modes, last.params
+                if mb == Mode.IMMEDIATE:
+                    successors.append(b)
+                if not (ma == Mode.IMMEDIATE and (a != 0) == (last.op == Opcode.JMP_TRUE)):
+                    successors.append(ip)
+            elif last.op != Opcode.HALT and ip in self.instructions:
+                successors.append(ip)
+
+            blocks.append(Block(start, ip, body, successors))
+
+        return blocks
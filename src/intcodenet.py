@@ -0,0 +1,159 @@
+# Advent of Code 2019, Intcode Network
+# (c) blu3r4y
+
+import asyncio
+from functools import partial
+from typing import Dict, Hashable, Optional, Sequence, Union
+
+import numpy as np
+
+from intcode import IntcodeMachine, ProgramImage
+
+
+class Node(object):
+
+    def __init__(self, vm: IntcodeMachine):
+        """
+        A machine within a network, along with its input channel and the channels it sends outputs to
+        @param vm: The machine
+        """
+        self.vm = vm
+        self.inbox = None  # created within the event loop
+        self.pending = []  # inputs that were fed before the network started
+        self.targets = []  # names of the nodes that receive our outputs
+        self.outputs = []  # all values that were sent by the machine
+
+
+class IntcodeNetwork(object):
+
+    def __init__(self):
+        """
+        Create an empty network of IntCode virtual machines, which communicate over channels.
+        Every machine runs as a coroutine that reads from its input channel and awaits it when it is empty,
+        so that it is only resumed once a value was actually sent to it. Outputs are sent as soon as they are written.
+        """
+        self.nodes = {}  # type: Dict[Hashable, Node]
+        self._waiting = set()
+
+    @property
+    def machines(self) -> Dict[Hashable, IntcodeMachine]:
+        """
+        @return: All machines by their name
+        """
+        return {name: node.vm for name, node in self.nodes.items()}
+
+    def add(self, name: Hashable, vm: IntcodeMachine) -> "IntcodeNetwork":
+        """
+        Add a machine to the network
+        @param name: A unique name for the machine
+        @param vm: The machine
+        @return: The network itself
+        """
+        if name in self.nodes:
+            raise ValueError(f"there is already a machine named {name}")
+
+        self.nodes[name] = Node(vm)
+        return self
+
+    def connect(self, source: Hashable, target: Hashable) -> "IntcodeNetwork":
+        """
+        Send all outputs of one machine to the input channel of another one,
+        a machine can send to several machines and receive from several machines
+        @param source: Name of the sending machine
+        @param target: Name of the receiving machine
+        @return: The network itself
+        """
+        self.nodes[source].targets.append(target)
+        return self
+
+    def feed(self, name: Hashable, values: Sequence[int]) -> "IntcodeNetwork":
+        """
+        Send values to the input channel of a machine before the network runs
+        @param name: Name of the receiving machine
+        @param values: The values to send
+        @return: The network itself
+        """
+        self.nodes[name].pending.extend(values)
+        return self
+
+    def run(self):
+        """
+        Run the network until every machine halted
+        """
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """
+        Run the network within an existing event loop until every machine halted
+        """
+        for node in self.nodes.values():
+            node.inbox = asyncio.Queue()
+            node.vm.inputs.extend(node.pending)  # consumed first, which also lets warm machines skip ahead
+            node.pending.clear()
+
+            node.vm.on_input = partial(self._receive, node)
+            node.vm.on_output = partial(self._send, node)
+
+        self._waiting.clear()
+        await asyncio.gather(*[self._run_node(name) for name in self.nodes])
+
+    async def _run_node(self, name: Hashable):
+        node = self.nodes[name]
+        while True:
+            node.vm.execute()
+            if node.vm.done:
+                self._check_deadlock()
+                break
+
+            # the machine only pauses on an empty channel, so wait until another machine sends us something
+            self._waiting.add(name)
+            self._check_deadlock()
+
+            node.vm.inputs.append(await node.inbox.get())
+            self._waiting.discard(name)
+
+    @staticmethod
+    def _receive(node: Node) -> Optional[int]:
+        return node.inbox.get_nowait() if not node.inbox.empty() else None
+
+    def _send(self, node: Node, value: int):
+        node.outputs.append(value)
+        for target in node.targets:
+            self.nodes[target].inbox.put_nowait(value)
+
+    def _check_deadlock(self):
+        # all remaining machines wait for input, but nobody is left to send it
+        alive = [name for name, node in self.nodes.items() if not node.vm.done]
+        if alive and all(name in self._waiting and self.nodes[name].inbox.empty() for name in alive):
+            raise RuntimeError(f"deadlock, machines {alive} wait for inputs that will never arrive")
+
+
+def pipeline(memory: Union[np.ndarray, str, ProgramImage], settings: Sequence[int], loop: bool = False,
+             **options) -> IntcodeNetwork:
+    """
+    Build a network of machines that run the same program, where each machine sends to the next one
+    @param memory: Program and data memory, or a shared program image
+    @param settings: One initial input value per machine, the machines are named 0, 1, 2, ...
+    @param loop: Let the last machine send to the first one, which turns the pipeline into a feedback ring
+    @param options: Further keyword arguments for the IntcodeMachine of each node
+    @return: The network
+    """
+    image = ProgramImage.load(memory)
+
+    network = IntcodeNetwork()
+    for i, setting in enumerate(settings):
+        network.add(i, IntcodeMachine(image, **options)).feed(i, [setting])
+    for i in range(len(settings) - 1):
+        network.connect(i, i + 1)
+    if loop:
+        network.connect(len(settings) - 1, 0)
+
+    return network
+
+
+def ring(memory: Union[np.ndarray, str, ProgramImage], settings: Sequence[int], **options) -> IntcodeNetwork:
+    """
+    Build a feedback ring of machines that run the same program, see pipeline()
+    """
+    return pipeline(memory, settings, loop=True, **options)
+
@@ -0,0 +1,116 @@
+# Advent of Code 2019, Intcode Process Pool
+# (c) blu3r4y
+
+from functools import partial
+from multiprocessing import Pool
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+from funcy import chunks
+
+from intcode import IntcodeMachine, ProgramImage
+
+# a job is either an input sequence, or an input sequence along with memory cells to patch before the execution
+Job = Union[Sequence[int], Tuple[Sequence[int], Dict[int, int]]]
+
+# machine of the current worker process, which is created once by the pool initializer
+_machine = None
+
+
+def _initialize(image: ProgramImage, options: dict):
+    global _machine
+    _machine = IntcodeMachine(image, **options)
+
+
+def _run(chunk: List[Tuple[Sequence[int], Dict[int, int]]], collect: Callable[[IntcodeMachine], Any]) -> List[Any]:
+    results = []
+    for inputs, patch in chunk:
+        _machine.reset()
+        for addr, value in patch.items():
+            _machine.memory[addr] = value
+
+        _machine.execute(list(inputs), nopause=True)
+        results.append(collect(_machine))
+
+    return results
+
+
+def outputs(vm: IntcodeMachine) -> List[int]:
+    """
+    @param vm: A machine that finished its job
+    @return: All of its output values
+    """
+    return list(vm.outputs)
+
+
+def memory_cell(vm: IntcodeMachine, addr: int = 0) -> int:
+    """
+    @param vm: A machine that finished its job
+    @param addr: A memory address (default: 0)
+    @return: The value of that memory cell
+    """
+    return vm.memory[addr]
+
+
+class IntcodePool(object):
+
+    def __init__(self, memory: Union[np.ndarray, str, ProgramImage], processes: int = None, **options):
+        """
+        Create a pool of worker processes that execute independent jobs on the same program.
+        The program is parsed and decoded once and shipped to every worker when it starts.
+        @param memory: Program and data memory, or a shared program image
+        @param processes: Number of worker processes, defaults to the number of cpus
+        @param options: Further keyword arguments for the IntcodeMachine of each worker
+        """
+        self.image = ProgramImage.load(memory)
+        self.processes = processes
+        self.options = options
+        self._pool = None
+
+    def map(self, jobs: Sequence[Job], chunksize: int = 64, collect: Callable[[IntcodeMachine], Any] = outputs,
+            stop: Callable[[Any], bool] = None) -> List[Any]:
+        """
+        Execute every job on a freshly reset machine until it halts and return their results in order
+        @param jobs: Input sequences, optionally along with a dictionary of memory cells to patch
+        @param chunksize: Number of jobs that are sent to a worker at once
+        @param collect: A picklable function that derives the result from a halted machine (default: all outputs)
+        @param stop: Optional predicate on the results, the remaining jobs are cancelled after the first match
+        @return: The results of all jobs, or of all jobs up to and including the first match
+        """
+        normalized = [job if isinstance(job, tuple) else (job, {}) for job in jobs]
+
+        results = []
+        for batch in self._get_pool().imap(partial(_run, collect=collect), chunks(chunksize, normalized)):
+            for result in batch:
+                results.append(result)
+                if stop is not None and stop(result):
+                    self.close(cancel=True)
+                    return results
+
+        return results
+
+    def close(self, cancel: bool = False):
+        """
+        Shut down the worker processes, a later call to map() starts new ones
+        @param cancel: Stop all workers immediately instead of waiting for pending jobs
+        """
+        if self._pool is not None:
+            if cancel:
+                self._pool.terminate()
+            else:
+                self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _get_pool(self) -> Pool:
+        if self._pool is None:
+            if self.options.get("engine", "interpreter") == "interpreter":
+                self.image.predecode(self.options.get("optimize", True), self.options.get("backend", "auto"))
+            self._pool = Pool(self.processes, initializer=_initialize, initargs=(self.image, self.options))
+        return self._pool
+
+    def __enter__(self) -> "IntcodePool":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
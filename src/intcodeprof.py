@@ -0,0 +1,99 @@
+# Advent of Code 2019, Intcode Profiler
+# (c) blu3r4y
+
+import json
+from collections import Counter, defaultdict, deque
+from typing import List, Sequence, Tuple
+
+from intcode import Mode, Opcode, SIGNATURES, IntcodeMachine
+
+
+class IntcodeProfiler(object):
+
+    def __init__(self, trace: int = 64):
+        """
+        Collect execution statistics of IntCode virtual machines. While a profiler is attached, the machine
+        decodes and times every instruction on its own, which is much slower than the regular engines,
+        but results do not depend on the engine. Detached profilers do not cost anything.
+        @param trace: Number of most recently executed instructions that are kept for post-mortem debugging
+        """
+        self.counts = Counter()  # executed instructions by opcode name
+        self.times = defaultdict(float)  # seconds spent in the handlers by opcode name
+        self.heatmap = Counter()  # executed instructions by address
+        self.modes = Counter()  # decoded parameters by mode name
+        self.trace = deque(maxlen=trace)  # (ip, opcode, relative base) of the last instructions
+
+    def attach(self, vm: IntcodeMachine) -> "IntcodeProfiler":
+        """
+        Profile all further executions of a machine
+        @param vm: The machine
+        @return: The profiler itself
+        """
+        vm.profiler = self
+        return self
+
+    @staticmethod
+    def detach(vm: IntcodeMachine):
+        """
+        Stop profiling a machine, which then runs on its regular engine again
+        @param vm: The machine
+        """
+        vm.profiler = None
+
+    def record(self, op: Opcode, ip: int, modes: Sequence[int], seconds: float):
+        """
+        Count an executed instruction, this is called by the machine
+        @param op: The opcode of the instruction
+        @param ip: The address of the instruction
+        @param modes: The three parameter modes, unused ones are ignored
+        @param seconds: Time spent in the handler
+        """
+        self.counts[op.name] += 1
+        self.times[op.name] += seconds
+        self.heatmap[ip] += 1
+        for mode in modes[:sum(SIGNATURES[op])]:
+            self.modes[Mode(mode).name] += 1
+
+    def hottest(self, n: int = 10) -> List[Tuple[int, int]]:
+        """
+        @param n: Number of addresses
+        @return: The n most frequently executed addresses along with their counts
+        """
+        return self.heatmap.most_common(n)
+
+    def reset(self):
+        """
+        Drop all statistics and the trace
+        """
+        self.counts.clear()
+        self.times.clear()
+        self.heatmap.clear()
+        self.modes.clear()
+        self.trace.clear()
+
+    def to_dict(self) -> dict:
+        """
+        @return: All statistics as a json-serializable dictionary
+        """
+        return {
+            "instructions": sum(self.counts.values()),
+            "seconds": sum(self.times.values()),
+            "counts": dict(self.counts),
+            "times": dict(self.times),
+            "modes": dict(self.modes),
+            "heatmap": {str(ip): count for ip, count in sorted(self.heatmap.items())},
+            "trace": [list(entry) for entry in self.trace]
+        }
+
+    def to_json(self, path: str = None) -> str:
+        """
+        Export all statistics with sorted keys, so that exports of different versions can be diffed
+        @param path: Optionally, also write the export to this file
+        @return: The json string
+        """
+        text = json.dumps(self.to_dict(), indent=2, sort_keys=True)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+
+        return text
@@ -0,0 +1,170 @@
+# Advent of Code 2019, Intcode Recorder
+# (c) blu3r4y
+
+import gzip
+import json
+from collections import namedtuple
+from typing import List
+
+from intcode import EVENT_INPUT, EVENT_OUTPUT, EVENT_STEPS, IntcodeMachine
+
+# the state of a machine after some event of the log, memory is stored as the cells that differ from the program
+Checkpoint = namedtuple("Checkpoint", ["position", "ip", "base", "done", "steps", "memory"])
+
+
+class IntcodeRecorder(object):
+
+    def __init__(self, interval: int = 4096):
+        """
+        Record every input value that a machine consumes and every output value that it produces,
+        along with the number of instructions that were executed in between. A replay serves the outputs
+        straight from the log, without executing a single instruction, as long as the inputs match the log.
+        @param interval: Capture a checkpoint of the machine after roughly this many events, which replays can start
+                         from, the state at the start and at the end of the recording is always captured
+        """
+        self.interval = interval
+        self.digest = None  # hash of the recorded program
+        self.kinds = []  # type: List[str]  # kind of every event, i.e. EVENT_INPUT, EVENT_OUTPUT or EVENT_STEPS
+        self.values = []  # type: List[int]  # value of every event, steps are the number of executed instructions
+        self.checkpoints = []  # type: List[Checkpoint]
+        self.vm = None  # the machine that is being recorded
+
+    @property
+    def inputs(self) -> List[int]:
+        """
+        @return: All recorded input values
+        """
+        return [value for kind, value in zip(self.kinds, self.values) if kind == EVENT_INPUT]
+
+    @property
+    def outputs(self) -> List[int]:
+        """
+        @return: All recorded output values
+        """
+        return [value for kind, value in zip(self.kinds, self.values) if kind == EVENT_OUTPUT]
+
+    @property
+    def steps(self) -> int:
+        """
+        @return: Number of recorded instructions
+        """
+        return sum(value for kind, value in zip(self.kinds, self.values) if kind == EVENT_STEPS)
+
+    def attach(self, vm: IntcodeMachine) -> "IntcodeRecorder":
+        """
+        Start recording a machine from its current state, which drops a previous recording,
+        warm starts and run caches are bypassed while recording, because they skip events
+        @param vm: The machine
+        @return: The recorder itself
+        """
+        self.digest = vm.digest
+        self.kinds.clear()
+        self.values.clear()
+        self.checkpoints = [self._capture(vm)]
+
+        vm.recorder, self.vm = self, vm
+        return self
+
+    def detach(self):
+        """
+        Stop recording and capture the final state of the machine
+        """
+        if self.vm is not None:
+            self.checkpoints.append(self._capture(self.vm))
+            self.vm.recorder, self.vm = None, None
+
+    def record(self, kind: str, value: int):
+        """
+        Log an input or output value, this is called by the machine
+        @param kind: EVENT_INPUT or EVENT_OUTPUT
+        @param value: The value
+        """
+        self.kinds.append(kind)
+        self.values.append(value)
+
+    def mark(self, vm: IntcodeMachine, steps: int):
+        """
+        Log the number of instructions of a finished run and capture a checkpoint from time to time,
+        this is called by the machine
+        @param vm: The machine
+        @param steps: Number of executed instructions
+        """
+        self.record(EVENT_STEPS, steps)
+        if len(self.kinds) - self.checkpoints[-1].position >= self.interval:
+            self.checkpoints.append(self._capture(vm))
+
+    def replay(self, vm: IntcodeMachine, checkpoint: int = 0) -> IntcodeMachine:
+        """
+        Let a machine of the same program replay the log, starting from some checkpoint. The machine serves
+        the recorded outputs as long as it receives the recorded inputs, but its memory is not updated until
+        the log is exhausted, then it continues from the final state of the recording and executes instructions again.
+        @param vm: The machine, whose state is replaced
+        @param checkpoint: Index of the checkpoint (default: 0, the start of the recording)
+        @return: The machine
+        """
+        self._check(vm)
+        if self.vm is not None:
+            raise RuntimeError("the recording is not finished yet, detach the recorder first")
+
+        self.resume(vm, checkpoint)
+        if self.checkpoints[checkpoint].position < len(self.kinds):
+            vm.replay, vm._cursor = self, self.checkpoints[checkpoint].position
+        return vm
+
+    def resume(self, vm: IntcodeMachine, checkpoint: int = -1) -> IntcodeMachine:
+        """
+        Revert a machine of the same program to some checkpoint, without replaying any events,
+        the input and output buffers are kept
+        @param vm: The machine, whose state is replaced
+        @param checkpoint: Index of the checkpoint (default: -1, the end of the recording)
+        @return: The machine
+        """
+        self._check(vm)
+        ip, base, done, steps, cells = self.checkpoints[checkpoint][1:]
+
+        state = dict(vm.checkpoint(), ip=ip, base=base, done=done, steps=steps, memory=sorted(cells.items()))
+        vm.load_checkpoint(state)
+        return vm
+
+    def save(self, path: str):
+        """
+        Write the log and all checkpoints to a gzip-compressed json file
+        @param path: Path of the log file
+        """
+        if self.vm is not None:
+            raise RuntimeError("the recording is not finished yet, detach the recorder first")
+
+        data = {
+            "digest": self.digest,
+            "interval": self.interval,
+            "kinds": "".join(self.kinds),
+            "values": self.values,
+            "checkpoints": [cp._replace(memory=sorted(cp.memory.items()))._asdict() for cp in self.checkpoints]
+        }
+
+        with gzip.open(path, "wt") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @staticmethod
+    def load(path: str) -> "IntcodeRecorder":
+        """
+        Read a log file
+        @param path: Path of the log file
+        @return: The finished recording, which can be replayed
+        """
+        with gzip.open(path, "rt") as f:
+            data = json.load(f)
+
+        recorder = IntcodeRecorder(data["interval"])
+        recorder.digest = data["digest"]
+        recorder.kinds = list(data["kinds"])
+        recorder.values = data["values"]
+        recorder.checkpoints = [Checkpoint(**dict(cp, memory=dict(cp["memory"]))) for cp in data["checkpoints"]]
+        return recorder
+
+    def _capture(self, vm: IntcodeMachine) -> Checkpoint:
+        return Checkpoint(len(self.kinds), vm.ip, vm.base, vm.done, vm.steps, vm.memory.diff())
+
+    def _check(self, vm: IntcodeMachine):
+        if vm.digest != self.digest:
+            raise ValueError("the machine runs a different program than the recorded one")
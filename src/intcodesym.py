@@ -0,0 +1,397 @@
+# Advent of Code 2019, Symbolic Intcode Machine
+# (c) blu3r4y
+
+from collections import Counter, deque
+from itertools import product
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from intcode import Mode, Opcode, SIGNATURES, LENGTHS, IntcodeMachine, ProgramImage
+
+# a product of variables, where a variable occurs once per power, e.g. ("noun", "noun", "verb") is noun^2 * verb
+Monomial = Tuple[str, ...]
+
+
+class SymbolicError(RuntimeError):
+    """
+    Raised when symbolic execution can not continue, e.g. at a branch on an unknown value
+    """
+    pass
+
+
+class Polynomial(object):
+
+    def __init__(self, terms: Dict[Monomial, int] = None):
+        """
+        A polynomial with integer coefficients over named variables, which is immutable
+        @param terms: Coefficients by their monomial, the constant term belongs to the empty monomial
+        """
+        self.terms = {m: c for m, c in (terms or {}).items() if c != 0}
+
+    @staticmethod
+    def variable(name: str) -> "Polynomial":
+        """
+        @param name: Name of the variable
+        @return: The polynomial that only consists of that variable
+        """
+        return Polynomial({(name,): 1})
+
+    @property
+    def constant(self) -> Optional[int]:
+        """
+        @return: The value of a constant polynomial, or None if it depends on some variable
+        """
+        if any(self.terms.keys() - {()}):
+            return None
+        return self.terms.get((), 0)
+
+    @property
+    def variables(self) -> List[str]:
+        """
+        @return: The names of all variables that occur in the polynomial, sorted by their name
+        """
+        return sorted({name for monomial in self.terms for name in monomial})
+
+    def degree(self, name: str = None) -> int:
+        """
+        @param name: Optional name of a variable
+        @return: The total degree, or the degree in that variable
+        """
+        if name is None:
+            return max((len(monomial) for monomial in self.terms), default=0)
+        return max((monomial.count(name) for monomial in self.terms), default=0)
+
+    def substitute(self, values: Dict[str, int]) -> "Polynomial":
+        """
+        @param values: Values of some variables
+        @return: The polynomial in the remaining variables
+        """
+        terms = Counter()
+        for monomial, coefficient in self.terms.items():
+            rest = tuple(name for name in monomial if name not in values)
+            for name in monomial:
+                if name in values:
+                    coefficient *= values[name]
+            terms[rest] += coefficient
+
+        return Polynomial(terms)
+
+    def evaluate(self, values: Dict[str, int]) -> int:
+        """
+        @param values: Values of all variables
+        @return: The value of the polynomial
+        """
+        return self.substitute(values).terms.get((), 0)
+
+    def solutions(self, value: int, domains: Dict[str, Sequence[int]]) -> Iterator[Dict[str, int]]:
+        """
+        Find all assignments of the variables within their domains where the polynomial takes some value.
+        The variable that was named last among those of degree 1 is solved for directly,
+        so that only the domains of the other variables need to be enumerated.
+        @param value: The value
+        @param domains: Candidate values of all variables, which are enumerated in this order
+        @return: All solutions, each one mapping every variable of the domains to its value
+        """
+        names = list(domains)
+        linear = [name for name in names if self.degree(name) <= 1]
+        x = linear[-1] if linear else names[-1]
+        others = [name for name in names if name != x]
+
+        for combination in product(*(domains[name] for name in others)):
+            fixed = dict(zip(others, combination))
+            rest = self.substitute(fixed)
+
+            if rest.degree(x) <= 1:
+                # rest = a * x + b
+                a, b = rest.terms.get((x,), 0), rest.terms.get((), 0)
+                if a == 0:
+                    candidates = domains[x] if b == value else []
+                else:
+                    candidates = [(value - b) // a] if (value - b) % a == 0 else []
+                    candidates = [v for v in candidates if v in domains[x]]
+            else:
+                candidates = [v for v in domains[x] if rest.evaluate({x: v}) == value]
+
+            for v in candidates:
+                yield dict(fixed, **{x: v})
+
+    def __add__(self, other: Union["Polynomial", int]) -> "Polynomial":
+        terms = Counter(self.terms)
+        terms.update(_polynomial(other).terms)
+        return Polynomial(terms)
+
+    __radd__ = __add__
+
+    def __mul__(self, other: Union["Polynomial", int]) -> "Polynomial":
+        terms = Counter()
+        for (m1, c1), (m2, c2) in product(self.terms.items(), _polynomial(other).terms.items()):
+            terms[tuple(sorted(m1 + m2))] += c1 * c2
+        return Polynomial(terms)
+
+    __rmul__ = __mul__
+
+    def __sub__(self, other: Union["Polynomial", int]) -> "Polynomial":
+        return self + _polynomial(other) * -1
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (int, np.integer)):
+            other = Polynomial({(): int(other)})
+        return isinstance(other, Polynomial) and self.terms == other.terms
+
+    def __hash__(self) -> int:
+        return hash(frozenset(self.terms.items()))
+
+    def __repr__(self) -> str:
+        if not self.terms:
+            return "0"
+
+        parts = []
+        for monomial in sorted(self.terms, key=lambda m: (-len(m), m)):
+            coefficient = self.terms[monomial]
+            factors = [name if power == 1 else f"{name}^{power}" for name, power in sorted(Counter(monomial).items())]
+            if coefficient != 1 or not factors:
+                factors.insert(0, str(coefficient))
+            parts.append("*".join(factors))
+
+        return " + ".join(parts).replace("+ -", "- ")
+
+
+def _polynomial(value: Union[Polynomial, int]) -> Polynomial:
+    return value if isinstance(value, Polynomial) else Polynomial({(): int(value)})
+
+
+def _simplify(value: Polynomial) -> Union[Polynomial, int]:
+    # constant polynomials are stored as plain integers
+    constant = value.constant
+    return constant if constant is not None else value
+
+
+# a cell holds an integer, a polynomial, or None if its value is unknown, because it was read through a symbolic address
+Value = Union[int, Polynomial, None]
+
+# a path constraint, i.e. a polynomial p and whether p == 0 or p < 0 held, along with the outcome of that test
+Constraint = Tuple[Polynomial, bool, bool]
+
+
+class SymbolicMachine(object):
+
+    def __init__(self, memory: Union[np.ndarray, str, ProgramImage], variables: Dict[int, str] = None,
+                 inputs: Sequence[Union[int, str]] = None, assignment: Dict[str, int] = None):
+        """
+        Execute a program on polynomials instead of integers, so that memory cells and outputs become
+        closed-form expressions of some variables. Additions and multiplications are propagated symbolically.
+        Branches, and anything else that needs a concrete value, are decided by evaluating the expression
+        with the assignment, which is recorded as a path constraint. Without an assignment, they raise a SymbolicError.
+        @param memory: Program and data memory, or a shared program image
+        @param variables: Names of the variables that some memory cells hold initially, by their address
+        @param inputs: Input values, where strings are the names of variables
+        @param assignment: Optional concrete values of the variables, which decide data-dependent branches
+        """
+        self.image = ProgramImage.load(memory)
+        self.memory = self.image.create_memory("list")  # concrete cells
+        self.symbols = {}  # type: Dict[int, Value]  # all cells that do not hold a concrete value
+        self.ip = 0
+        self.base = 0
+        self.done = False
+        self.inputs = deque(inputs if inputs is not None else [])
+        self.outputs = []  # type: List[Value]
+        self.assignment = assignment
+        self.constraints = []  # type: List[Constraint]
+        self.steps = 0
+
+        for addr, name in (variables or {}).items():
+            self.write(addr, Polynomial.variable(name))
+
+    def read(self, addr: int) -> Value:
+        """
+        @param addr: A memory address
+        @return: The integer, polynomial, or None if the value is unknown
+        """
+        if addr in self.symbols:
+            return self.symbols[addr]
+        return self.memory.read(addr)
+
+    def write(self, addr: int, value: Value):
+        """
+        @param addr: A memory address
+        @param value: An integer, a polynomial, or None if the value is unknown
+        """
+        if isinstance(value, Polynomial):
+            value = _simplify(value)
+
+        if value is None or isinstance(value, Polynomial):
+            self.symbols[addr] = value
+        else:
+            self.symbols.pop(addr, None)
+            self.memory.write(addr, value)
+
+    def satisfies(self, assignment: Dict[str, int]) -> bool:
+        """
+        @param assignment: Values of all variables
+        @return: True if the assignment follows the same path, so that all results are valid for it
+        """
+        return all((p.evaluate(assignment) == 0 if equals else p.evaluate(assignment) < 0) == outcome
+                   for p, equals, outcome in self.constraints)
+
+    def run(self) -> "SymbolicMachine":
+        """
+        Execute the program until it halted or the input buffer is empty
+        @return: The machine itself
+        """
+        while not self.done:
+            opcode = self._concrete(self.read(self.ip), f"the opcode at ip = {self.ip}")
+            instrcode = opcode % 100
+            if instrcode not in SIGNATURES:
+                raise ValueError(f"unknown opcode {opcode} at ip = {self.ip}")
+
+            op = Opcode(instrcode)
+            nin, nout = SIGNATURES[op]
+            modes = [opcode // (10 ** (i + 2)) % 10 for i in range(nin + nout)]
+            params = [self.read(self.ip + 1 + i) for i in range(nin + nout)]
+            args = [self._load(mode, param) for mode, param in zip(modes[:nin], params[:nin])]
+            following = self.ip + LENGTHS[op]
+
+            if op == Opcode.INPUT:
+                if not self.inputs:
+                    return self  # pause until more input is available
+                value = self.inputs.popleft()
+                args = [Polynomial.variable(value) if isinstance(value, str) else value]
+
+            if op in (Opcode.ADD, Opcode.MUL):
+                a, b = args
+                if a is None or b is None:
+                    result = None  # unknown values only matter if they are used later on
+                else:
+                    result = a + b if op == Opcode.ADD else a * b
+            elif op == Opcode.LESS_THAN:
+                result = int(self._test(_difference(*args, "comparison"), False))
+            elif op == Opcode.EQUALS:
+                result = int(self._test(_difference(*args, "comparison"), True))
+            elif op == Opcode.INPUT:
+                result = args[0]
+            elif op == Opcode.OUTPUT:
+                self.outputs.append(args[0])
+            elif op in (Opcode.JMP_TRUE, Opcode.JMP_FALSE):
+                if self._test(_known(args[0], "jump condition"), True) != (op == Opcode.JMP_TRUE):
+                    following = self._concrete(args[1], "jump target")
+            elif op == Opcode.BASE_OFFSET:
+                self.base += self._concrete(args[0], "relative base offset")
+            elif op == Opcode.HALT:
+                self.done = True
+                following = self.ip
+
+            if nout > 0:
+                self.write(self._address(modes[nin], params[nin], "output address"), result)
+
+            self.ip = following
+            self.steps += 1
+
+        return self
+
+    def _load(self, mode: int, param: Value) -> Value:
+        if mode == Mode.IMMEDIATE:
+            return param
+        if mode not in (Mode.POSITION, Mode.RELATIVE):
+            raise ValueError(f"unknown parameter mode {mode} at ip = {self.ip}")
+        if param is None or isinstance(param, Polynomial):
+            return None  # reading through a symbolic address, the value is only needed if it is used later on
+
+        return self.read(param if mode == Mode.POSITION else self.base + param)
+
+    def _address(self, mode: int, param: Value, what: str) -> int:
+        if mode not in (Mode.POSITION, Mode.RELATIVE):
+            raise ValueError(f"unsupported parameter mode {mode} for the {what} at ip = {self.ip}")
+        addr = self._concrete(param, what)
+        return addr if mode == Mode.POSITION else self.base + addr
+
+    def _test(self, value: Union[Polynomial, int], equals: bool) -> bool:
+        # decide whether value == 0, or value < 0, and remember the outcome if it depends on the variables
+        if not isinstance(value, Polynomial):
+            return value == 0 if equals else value < 0
+
+        concrete = self._concrete(value, "branch condition", record=False)
+        outcome = concrete == 0 if equals else concrete < 0
+        self.constraints.append((value, equals, outcome))
+        return outcome
+
+    def _concrete(self, value: Value, what: str, record: bool = True) -> int:
+        # evaluate a value with the assignment and constrain the path to that very value
+        if not isinstance(value, Polynomial):
+            return _known(value, what)
+        if self.assignment is None:
+            raise SymbolicError(f"the {what} depends on {value}, which needs an assignment")
+
+        concrete = value.evaluate(self.assignment)
+        if record:
+            self.constraints.append((value - concrete, True, True))
+        return concrete
+
+
+def _known(value: Value, what: str) -> Union[Polynomial, int]:
+    if value is None:
+        raise SymbolicError(f"the {what} depends on a value that was read through a symbolic address")
+    return value
+
+
+def _difference(a: Value, b: Value, what: str) -> Union[Polynomial, int]:
+    # a < b is the same as a - b < 0, and a == b is the same as a - b == 0
+    difference = _known(a, what) - _known(b, what)
+    return _simplify(difference) if isinstance(difference, Polynomial) else difference
+
+
+def solve(memory: Union[np.ndarray, str, ProgramImage], value: int, domains: Dict[str, Sequence[int]],
+          variables: Dict[int, str] = None, inputs: Sequence[Union[int, str]] = None,
+          cell: int = None, output: int = -1) -> Optional[Dict[str, int]]:
+    """
+    Find values of some variables, so that the program computes a given result, e.g. a memory cell after it halted.
+    The result is derived symbolically along the path of the first candidate and solved for directly,
+    unknown results, or solutions that take another path, fall back to concrete execution.
+    @param memory: Program and data memory, or a shared program image
+    @param value: The result that the program should compute
+    @param domains: Candidate values of all variables, which are tried in this order
+    @param variables: Names of the variables that some memory cells hold initially, by their address
+    @param inputs: Input values, where strings are the names of variables
+    @param cell: Address of the memory cell that holds the result after the program halted,
+                 otherwise the result is an output value
+    @param output: Index of the output value that is the result (default: -1, the last one)
+    @return: The first solution that was found, or None if there is none
+    """
+    image = ProgramImage.load(memory)
+    variables = variables or {}
+    inputs = list(inputs or [])
+
+    vm = IntcodeMachine(image)
+
+    def concrete(assignment: Dict[str, int]) -> int:
+        # run the program with the concrete values of the variables
+        vm.reset()
+        for addr, name in variables.items():
+            vm.memory[addr] = assignment[name]
+        vm.execute([assignment[v] if isinstance(v, str) else v for v in inputs], nopause=True)
+        return vm.memory[cell] if cell is not None else vm.outputs[output]
+
+    first = {name: domain[0] for name, domain in domains.items()}
+    try:
+        machine = SymbolicMachine(image, variables, inputs, first).run()
+        result = machine.read(cell) if cell is not None else machine.outputs[output]
+        if not machine.done or result is None:
+            raise SymbolicError("the result is unknown")
+    except SymbolicError:
+        machine, result = None, None
+
+    if machine is not None:
+        for solution in _polynomial(result).solutions(value, domains):
+            if machine.satisfies(solution) or concrete(solution) == value:
+                return solution
+
+        # without path constraints, the result covers every assignment
+        if not machine.constraints:
+            return None
+
+    for combination in product(*domains.values()):
+        assignment = dict(zip(domains, combination))
+        if concrete(assignment) == value:
+            return assignment
+
+    return None
@@ -0,0 +1,8 @@
+# Advent of Code 2019, Test Configuration
+# (c) blu3r4y
+
+import os
+import sys
+
+# the modules of the solutions are flat files in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
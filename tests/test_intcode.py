@@ -0,0 +1,168 @@
+# Advent of Code 2019, Intcode Tests
+# (c) blu3r4y
+
+import json
+import struct
+from itertools import product
+
+import pytest
+
+from intcode import ENGINES, IMAGE_MAGIC, RECOMPILE_LIMIT, REDECODE_LIMIT, IntcodeMachine, ProgramImage, Status, \
+    _first_exit
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stream_ascii(engine):
+    # characters go to the text buffer, so streaming must not stop before the first non-character value
+    vm = IntcodeMachine("104,65,104,10,104,66,104,10,104,300,99", ascii=True, engine=engine)
+    assert list(vm.stream()) == [300]
+    assert vm.done
+    assert vm.read_text() == "A\nB\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stream_pauses_for_input(engine):
+    vm = IntcodeMachine("3,20,4,20,1105,1,0", engine=engine)
+    assert list(vm.stream([1, 2, 3])) == [1, 2, 3]
+    assert not vm.done
+
+
+@pytest.mark.parametrize("optimize", [True, False])
+@pytest.mark.parametrize("budget", [1, 2, 3, 100, 1001])
+def test_budget_counts_superinstructions(budget, optimize):
+    # the compare and jump of the loop are fused into a superinstruction, which counts as two instructions
+    vm = IntcodeMachine("1101,0,0,100,1001,100,1,100,1007,100,200000,101,1005,101,4,4,100,99", optimize=optimize)
+    assert vm.run(steps=budget) == Status.BUDGET
+    assert budget <= vm.steps <= budget + 1
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("program", ["1101,0,7,300,21101,0,42,-1,4,511,99", "1101,0,42,-1,99", "1,-3,0,0,99"])
+def test_negative_address(engine, program):
+    # negative addresses must not wrap around to the last page of the page table
+    vm = IntcodeMachine(program, engine=engine)
+    with pytest.raises(IndexError, match="negative memory address"):
+        vm.execute(nopause=True)
+    assert vm.memory[511] == 0
+
+
+def test_warm_start_counts_steps():
+    # the second machine continues from the cached states of the first one, but must count the same instructions
+    program, inputs = "3,100,1006,100,14,1002,100,2,101,4,101,1105,1,0,99", [1, 2, 3, 0]
+    cold = IntcodeMachine(program)
+    cold.execute(inputs, nopause=True)
+    for _ in range(2):
+        warm = IntcodeMachine(program, warm=len(inputs))
+        warm.execute(inputs, nopause=True)
+        assert warm.steps == cold.steps
+
+    warm.reset()
+    warm.execute(inputs, nopause=True)
+    assert warm.steps == 2 * cold.steps
+
+
+@pytest.mark.parametrize("equals", [False, True])
+@pytest.mark.parametrize("proceed", [False, True])
+def test_first_exit(equals, proceed):
+    # compare against trying every iteration, these loops exit within a few iterations, if ever
+    for d0, stride in product(range(-12, 13), range(-5, 6)):
+        flags = [d0 + stride * i == 0 if equals else d0 + stride * i < 0 for i in range(64)]
+        expected = next((i for i, flag in enumerate(flags) if flag != proceed), None)
+        assert _first_exit(d0, stride, equals, proceed) == expected, (d0, stride)
+
+
+@pytest.mark.parametrize("program, skipped", [
+    # less than, then jump if true
+    ("1101,0,0,100,1001,100,1,100,1007,100,50,101,1005,101,4,4,100,99", True),
+    # equals, then jump if false
+    ("1101,0,0,100,1001,100,3,100,1008,100,60,101,1006,101,4,4,100,99", True),
+    # jump on the counter itself
+    ("1101,0,-40,100,1001,100,2,100,1005,100,4,4,100,99", True),
+    # comparison before the addition
+    ("1101,0,0,100,1007,100,49,101,1001,100,1,100,1005,101,4,4,100,99", True),
+    # stride read from a cell
+    ("1101,0,0,100,1101,0,3,102,1,100,102,100,1007,100,90,101,1005,101,8,4,100,99", True),
+    # two counters that are compared against each other
+    ("1101,0,0,100,1101,0,100,102,1001,100,2,100,1001,102,-1,102,7,100,102,101,1005,101,8,4,100,99", True),
+    # relative counter and flag
+    ("109,200,21101,0,0,0,21201,0,1,0,21207,0,50,1,1205,1,6,204,0,99", True),
+    # too few iterations
+    ("1101,0,0,100,1001,100,1,100,1007,100,5,101,1005,101,4,4,100,99", False),
+    # two additions to the same cell
+    ("1101,0,0,100,1001,100,1,100,1001,100,2,100,1007,100,90,101,1005,101,4,4,100,99", False),
+    # stride read from another counter
+    ("1101,0,0,100,1101,0,1,102,1,100,102,100,1001,102,1,102,1007,100,500,101,1005,101,8,4,100,99", False),
+    # comparison that reads its own flag
+    ("1101,0,50,101,1001,100,1,100,7,100,101,101,1005,101,4,4,100,99", False),
+])
+def test_induction_loop(program, skipped):
+    # fast-forwarded loops must leave the very same state behind as the plain interpreter
+    fast, plain = IntcodeMachine(program), IntcodeMachine(program, optimize=False)
+    assert fast.execute(nopause=True) == plain.execute(nopause=True)
+    assert (fast.ip, fast.base, fast.steps) == (plain.ip, plain.base, plain.steps)
+    assert fast.memory.diff() == plain.memory.diff()
+    assert (fast.skipped > 0) == skipped
+
+
+def test_self_modifying_loop(monkeypatch):
+    # the loop head is patched in every iteration, so it is no longer searched for superinstructions after a while
+    searched, induction = [], IntcodeMachine._induction
+
+    def search(vm, ip, instr):
+        searched.append(ip)
+        return induction(vm, ip, instr)
+
+    monkeypatch.setattr(IntcodeMachine, "_induction", search)
+
+    vm = IntcodeMachine("1101,0,0,100,1101,0,0,101,1,102,101,102,1001,6,1,6,1001,100,1,100,"
+                        "1007,100,200,103,1005,103,4,4,102,99")
+    assert vm.execute(nopause=True) == sum(range(200))
+    assert vm._redecodes[4] == 200
+    assert searched.count(4) <= REDECODE_LIMIT + 1  # the first time, it might be decoded from the unmodified image
+
+
+def test_self_modifying_block():
+    # the loop patches an operand of its own body in every iteration, so its block is interpreted after a few rounds
+    vm = IntcodeMachine("1101,0,0,100,1101,0,0,101,1,102,101,102,1001,6,1,6,1001,100,1,100,"
+                        "1007,100,200,103,1005,103,4,4,102,99", engine="compiler")
+    assert vm.execute(nopause=True) == sum(range(200))
+    assert vm.steps == 6 * 200 + 3
+    assert max(vm._recompiles.values()) == RECOMPILE_LIMIT
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("program", ["1105,1,-7,104,42,99", "5,7,8,104,42,99,0,-3,-5", "1107,1,2,9,1005,9,-5,99,99,0"])
+def test_negative_jump_target(engine, program):
+    # negative instruction pointers stop the dispatch loop, so the machine would seem to wait for input
+    vm = IntcodeMachine(program, engine=engine)
+    with pytest.raises(IndexError, match="negative instruction pointer"):
+        vm.run()
+    assert not vm.done
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_untaken_jump_target(engine):
+    # the target is only loaded if the jump is taken, so its negative address does not matter here
+    vm = IntcodeMachine("109,5,2105,0,-396,104,1,99", engine=engine)
+    assert vm.execute(nopause=True) == 1
+
+
+def test_image_file_roundtrip(tmp_path):
+    path = str(tmp_path / "quine.icb")
+    quine = "109,1,204,-1,1001,100,1,100,1008,100,16,101,1006,101,0,99"
+    ProgramImage(quine, metadata={"name": "quine"}).save(path)
+
+    image = ProgramImage.open(path)
+    assert image.metadata == {"name": "quine"} and not image.decoded
+    assert list(IntcodeMachine(image).stream()) == list(map(int, quine.split(",")))
+
+
+def test_image_file_rejects_other_versions(tmp_path):
+    # earlier image files carried a pickled section, which must never be loaded
+    path = str(tmp_path / "old.icb")
+    header = json.dumps({"cells": 1, "digest": "x", "metadata": {}, "cache": 4}).encode()
+    with open(path, "wb") as f:
+        f.write(IMAGE_MAGIC + struct.pack("<Q", len(header)) + header + struct.pack("<q", 99) + b"junk")
+
+    with pytest.raises(ValueError, match="unsupported image version"):
+        ProgramImage.open(path)
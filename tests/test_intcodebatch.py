@@ -0,0 +1,76 @@
+# Advent of Code 2019, Batched Intcode Machine Tests
+# (c) blu3r4y
+
+from itertools import product
+
+import numpy as np
+
+from intcode import IntcodeMachine
+from intcodebatch import IntcodeBatch
+
+# a day 2 program, whose result in cell 0 depends on the noun and verb in cells 1 and 2
+GRAVITY = "1,0,0,3,1,1,2,3,1,3,4,3,1,5,0,3,2,1,10,19,1,19,5,23,2,23,9,27,1,5,27,31,99,0"
+
+
+def test_noun_verb_search():
+    # all noun and verb combinations in lockstep, just like the brute force of day 2 used to do
+    nouns, verbs = np.array(list(product(range(10), repeat=2))).T
+    batch = IntcodeBatch(GRAVITY, len(nouns))
+    batch.memory[:, 1], batch.memory[:, 2] = nouns, verbs
+    batch.run()
+
+    assert batch.done.all()
+    for i, (noun, verb) in enumerate(zip(nouns, verbs)):
+        vm = IntcodeMachine(GRAVITY)
+        vm.memory[1], vm.memory[2] = int(noun), int(verb)
+        vm.execute(nopause=True)
+        assert batch.memory[i, 0] == vm.memory[0]
+
+
+def test_inputs_and_outputs():
+    # doubles every input value until it reads a zero
+    batch = IntcodeBatch("3,100,1006,100,14,1002,100,2,101,4,101,1105,1,0,99", 3, [[1, 2, 0], [5], []])
+    batch.run()
+
+    assert batch.done.tolist() == [True, False, False]
+    assert batch.waiting.tolist() == [False, True, True]
+    assert [batch.get_output(i) for i in range(3)] == [[2, 4], [10], []]
+
+    batch.feed([[], [0], [7, 0]])
+    batch.run()
+    assert batch.done.all()
+    assert [batch.get_output(i) for i in range(3)] == [[2, 4], [10], [14]]
+
+
+def test_unused_jump_target():
+    # the target at a negative address is only loaded if the jump is taken
+    batch = IntcodeBatch("3,9,5,9,-1,4,9,99,0,0", 2, [[0], [1]])
+    batch.run()
+
+    assert batch.done.tolist() == [True, False]
+    assert batch.get_output(0) == [0]
+    assert batch.failed.tolist() == [False, True]
+    assert list(batch.errors) == [1] and isinstance(batch.errors[1], IndexError)
+
+
+def test_failing_instances():
+    # every instance fails in a different way, except for the last one, which prints its input twice
+    batch = IntcodeBatch("3,13,1002,13,2,14,4,14,4,14,99,0,0,0,0", 4, [[1], [2 ** 62], [5], [3]])
+    batch.memory[2, 1] = -1  # the input is stored at a negative address
+    batch.run()
+
+    assert batch.failed.tolist() == [False, True, True, False]
+    assert isinstance(batch.errors[1], OverflowError) and isinstance(batch.errors[2], IndexError)
+    assert batch.done.tolist() == [True, False, False, True]
+    assert batch.get_output(0) == [2, 2] and batch.get_output(3) == [6, 6]
+
+
+def test_steps_and_memory():
+    # every instance counts its own instructions and changes its own memory, just like a single machine
+    batch = IntcodeBatch("3,100,1006,100,14,1002,100,2,101,4,101,1105,1,0,99", 2, [[3, 0], [0]])
+    batch.run()
+
+    for i, inputs in enumerate([[3, 0], [0]]):
+        vm = IntcodeMachine("3,100,1006,100,14,1002,100,2,101,4,101,1105,1,0,99", inputs)
+        vm.execute(nopause=True)
+        assert (batch.ip[i], batch.steps[i], batch.diff(i)) == (vm.ip, vm.steps, vm.memory.diff())
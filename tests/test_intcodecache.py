@@ -0,0 +1,42 @@
+# Advent of Code 2019, Intcode Run Cache Tests
+# (c) blu3r4y
+
+import pytest
+
+from intcode import IntcodeMachine, Status
+from intcodecache import RunCache
+
+# doubles its two input values and stores them in cells 10 and 11
+DOUBLE = "3,10,1002,10,2,10,3,11,1002,11,2,11,4,10,4,11,99,0,0"
+
+
+def state(vm: IntcodeMachine) -> tuple:
+    return vm.ip, vm.base, vm.done, vm.status, vm.steps, list(vm.inputs), list(vm.outputs), vm.memory.diff()
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+def test_cache_hit_restores_state(tmp_path, persistent):
+    # a cache hit must leave the machine in the very same state as the run that it replaces
+    path = str(tmp_path / "runs.db") if persistent else None
+    cold = IntcodeMachine(DOUBLE, cache=RunCache(path=path))
+    cold.execute([3, 4, 5], nopause=True)
+
+    cache = RunCache(path=path) if persistent else cold.cache
+    hit = IntcodeMachine(DOUBLE, cache=cache)
+    hit.execute([3, 4, 5], nopause=True)
+
+    assert cache.info().hits == 1
+    assert state(hit) == state(cold)
+    assert hit.status == Status.HALTED and hit.memory[10] == 6 and list(hit.inputs) == [5]
+
+
+def test_cache_hit_after_reset():
+    # the instruction counter survives resets, so cached runs add to it just like cold runs do
+    vm = IntcodeMachine(DOUBLE, cache=RunCache())
+    vm.execute([3, 4], nopause=True)
+    steps = vm.steps
+
+    vm.reset()
+    vm.execute([3, 4], nopause=True)
+    assert vm.cache.info().hits == 1
+    assert vm.steps == 2 * steps